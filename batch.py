@@ -0,0 +1,191 @@
+'''
+Headless batch runs of the pet and exp calculators.
+
+    python batch.py pets pet_data.txt > pets.jsonl
+    python batch.py pets --top 5 --format csv < rows.tsv
+    python batch.py exp scenarios.tsv
+
+pets reads rows in the pet_data.txt layout (name, 초기계수, HP, Att, Def, Agi).
+exp reads one scenario per line:
+
+    exp per hour or hunting ground, current level, current %, desired level
+    [, party count, item multiplier, transform %, newbie 0/1, hero echo 0/1]
+
+Rows are fanned out over a process pool in chunks and written as soon as
+each chunk comes back, so output order follows completion; every record
+carries the input line number. A row that cannot be parsed or calculated
+gets a record with an error instead of stopping the run. Nothing here
+imports Qt.
+'''
+
+import argparse
+import csv
+import json
+import sys
+from multiprocessing import Pool
+
+from exp_calculator import (
+    _format_time, _remaining_exp, calculate_exp_buff, calculate_time_for_lvl, check_level_range,
+)
+from pet_calculator import get_min_hp, get_pet_distribution, iter_formatted_distribution, represent_s_pet
+from presets import HUNT_DATA_PATH, load_hunt_presets, parse_pet_line
+
+INVALID = "잘못된 입력"
+# A row that parsed but could not be calculated, e.g. values too large for the tables
+FAILED = "계산 실패"
+
+PET_FIELDS = ["line", "name", "values", "represent", "min_hp", "min_hp_all", "max_rows", "rows", "top", "error"]
+EXP_FIELDS = [
+    "line", "hunt", "exp_per_hour", "current_lvl", "current_per", "desired_lvl",
+    "remaining_exp", "time_in_min", "time", "error",
+]
+
+def _read_lines(paths):
+    # (line number, line) over the files in order, or stdin
+    number = 0
+    for path in paths or ["-"]:
+        f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+        try:
+            for line in f:
+                number += 1
+                if line.strip() and not line.startswith("#"):
+                    yield number, line
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+def run_pet(task):
+    (number, line), top, sort_key = task
+    try:
+        row = parse_pet_line(line)
+    except ValueError:
+        row = None
+    if row is None:
+        return {"line": number, "error": INVALID}
+    name, values = row
+    try:
+        return _pet_record(number, name, values, top, sort_key)
+    except (ValueError, OverflowError, IndexError, MemoryError):
+        return {"line": number, "name": name, "values": values, "error": FAILED}
+
+def _pet_record(number, name, values, top, sort_key):
+    dist = get_pet_distribution(*values)
+    max_rows = sum(1 for i in range(len(dist)) if dist.is_max(i))
+    record = {
+        "line": number,
+        "name": name,
+        "values": values,
+        "represent": represent_s_pet(*values),
+        "min_hp": get_min_hp(dist, True),
+        # None when every stat is a max base
+        "min_hp_all": get_min_hp(dist, False) if max_rows < len(dist) else None,
+        "max_rows": max_rows,
+        "rows": len(dist),
+    }
+    if top:
+        record["top"] = [
+            entry.rstrip("\n") for entry in iter_formatted_distribution(dist, True, sort_key, limit=top)
+        ]
+    return record
+
+def parse_scenario(line, hunts):
+    parts = [part.strip() for part in line.rstrip("\n").split("\t")]
+    if not 4 <= len(parts) <= 9:
+        raise ValueError(line)
+    hunt = parts[0]
+    exp = int(hunts[hunt]) if hunt in hunts else int(hunt)
+    flags = [int(part) for part in parts[4:]]
+    party_count, item_buff, transform_item, newbie_item, hero_echo = flags + [1, 1, 0, 0, 0][len(flags):]
+    current_lvl, current_per, desired_lvl = int(parts[1]), float(parts[2]), int(parts[3])
+    check_level_range(current_lvl, current_per, desired_lvl)
+    return {
+        "hunt": hunt,
+        "exp": exp,
+        "current_lvl": current_lvl,
+        "current_per": current_per,
+        "desired_lvl": desired_lvl,
+        "party_count": party_count,
+        "item_buff": item_buff,
+        "transform_item": transform_item,
+        "newbie_item": bool(newbie_item),
+        "hero_echo": bool(hero_echo),
+    }
+
+def run_exp(task):
+    (number, line), hunts = task
+    try:
+        s = parse_scenario(line, hunts)
+    except (ValueError, KeyError):
+        return {"line": number, "error": INVALID}
+    try:
+        return _exp_record(number, s)
+    except (ValueError, OverflowError, ZeroDivisionError):
+        return {"line": number, "hunt": s["hunt"], "error": FAILED}
+
+def _exp_record(number, s):
+    exp_per_hour = calculate_exp_buff(
+        s["exp"], transform_item=s["transform_item"], item_buff=s["item_buff"],
+        party_count=s["party_count"], newbie_item=s["newbie_item"], hero_echo=s["hero_echo"],
+    )
+    time_in_min = calculate_time_for_lvl(s["current_lvl"], s["current_per"], s["desired_lvl"], exp_per_hour)
+    return {
+        "line": number,
+        "hunt": s["hunt"],
+        "exp_per_hour": exp_per_hour,
+        "current_lvl": s["current_lvl"],
+        "current_per": s["current_per"],
+        "desired_lvl": s["desired_lvl"],
+        "remaining_exp": _remaining_exp(s["current_lvl"], s["current_per"], s["desired_lvl"]),
+        "time_in_min": time_in_min,
+        "time": _format_time(time_in_min),
+    }
+
+class JsonLinesWriter:
+    def __init__(self, out, fields):
+        self.out = out
+
+    def write(self, record):
+        self.out.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+class CsvWriter:
+    def __init__(self, out, fields):
+        self.writer = csv.DictWriter(out, fieldnames=fields, extrasaction="ignore")
+        self.writer.writeheader()
+
+    def write(self, record):
+        self.writer.writerow({
+            key: "|".join(map(str, value)) if isinstance(value, list) else value
+            for key, value in record.items()
+        })
+
+WRITERS = {"jsonl": JsonLinesWriter, "csv": CsvWriter}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the pet or exp calculator over many inputs")
+    parser.add_argument("mode", choices=["pets", "exp"])
+    parser.add_argument("files", nargs="*", help="input files, stdin if none or -")
+    parser.add_argument("--format", choices=sorted(WRITERS), default="jsonl")
+    parser.add_argument("--workers", type=int, help="processes, all cores by default")
+    parser.add_argument("--chunksize", type=int, default=8, help="rows sent to a worker at a time")
+    parser.add_argument("--top", type=int, default=0, help="pets: also output the N most likely max base stats")
+    parser.add_argument("--sort", choices=["base_chance", "encounter_chance"], default="base_chance")
+    parser.add_argument("--hunts", default=HUNT_DATA_PATH, help="exp: hunting ground names")
+    args = parser.parse_args(argv)
+
+    lines = _read_lines(args.files)
+    if args.mode == "pets":
+        func, fields = run_pet, PET_FIELDS
+        tasks = ((item, args.top, args.sort) for item in lines)
+    else:
+        func, fields = run_exp, EXP_FIELDS
+        hunts = load_hunt_presets(args.hunts)
+        tasks = ((item, hunts) for item in lines)
+
+    writer = WRITERS[args.format](sys.stdout, fields)
+    with Pool(args.workers) as pool:
+        for record in pool.imap_unordered(func, tasks, chunksize=args.chunksize):
+            writer.write(record)
+            sys.stdout.flush()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+'''
+Benchmarks for the calculator hot paths.
+
+Runs every pet in pet_data.txt through the pet stages and a grid of exp
+scenarios through the exp stages, then writes one JSON report:
+
+    python benchmark.py --out bench.json
+    python benchmark.py --baseline bench.json --threshold 0.2
+    python benchmark.py --limit 20 --no-check
+
+Each stage records its total wall time (best of --repeat passes) and, from
+a separate tracemalloc pass, its peak traced memory and how many more memory
+blocks were live afterwards. Outputs are hashed per stage and checked against
+the reference implementation (the pure python engine with calculate_chances,
+and the level by level exp loop). The max base fast path is also checked on
+EDGE_VALUES, presets whose raw stats go negative, which pet_data.txt has
+none of. The exit status is 1 if any output differs
+from the reference or the baseline, or if a stage got slower or bigger than
+the baseline by more than the threshold.
+'''
+
+import argparse
+import hashlib
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from itertools import product
+
+import exp_calculator as ec
+import pet_calculator as pc
+from presets import HUNT_DATA_PATH, PET_DATA_PATH, load_hunt_presets, load_pet_presets
+
+# Differences smaller than this are noise, whatever the ratio
+MIN_SECONDS = 0.005
+MIN_BYTES = 64 * 1024
+
+# Intermediate results, their outputs are checked through the stages built on them
+UNHASHED = {"get_distribution_dict", "calculate_chances", "get_pet_distribution"}
+
+# Negative raw stats, where int() truncating toward zero matters to the pruned bounds
+EDGE_VALUES = [
+    (10, -6, -6, -6, -6), (1, -5, -5, -5, -5), (3, -10, 2, 2, 2),
+    (8, -28, -27, 53, 39), (6, -2, -28, 20, -12), (3, -28, 27, -29, 5), (0, 5, 5, 5, 5),
+]
+
+def _pet_stages():
+    # (stage, function of the results so far), run in order for each pet
+    return [
+        ("get_distribution_dict", lambda r: pc.get_distribution_dict(*r["values"])),
+        ("calculate_chances", lambda r: pc.calculate_chances(r["get_distribution_dict"])),
+        ("formatted_distribution", lambda r: (
+            pc.formatted_distribution(r["calculate_chances"], True, "base_chance"),
+            pc.formatted_distribution(r["calculate_chances"], False, "encounter_chance"),
+        )),
+        ("get_min_hp", lambda r: (
+            pc.get_min_hp(r["calculate_chances"], True),
+            pc.get_min_hp(r["calculate_chances"], False),
+        )),
+        ("get_pet_distribution", lambda r: pc.get_pet_distribution(*r["values"])),
+        ("formatted_pet_distribution", lambda r: (
+            pc.formatted_distribution(r["get_pet_distribution"], True, "base_chance"),
+            pc.formatted_distribution(r["get_pet_distribution"], False, "encounter_chance"),
+        )),
+        ("get_max_base_distribution", lambda r: pc.formatted_distribution(
+            pc.get_max_base_distribution(*r["values"]), True, "base_chance"
+        )),
+    ]
+
+def _exp_scenarios():
+    levels = range(1, 150, 7)
+    return [
+        (current_lvl, current_per, desired_lvl)
+        for current_lvl, current_per, desired_lvl in product(levels, (0, 37.5), (50, 100, 130, 149))
+        if current_lvl < desired_lvl
+    ]
+
+def _exp_stages(hunts):
+    scenarios = _exp_scenarios()
+    rates = [
+        ec.calculate_exp_buff(int(exp), transform_item=t, item_buff=i, party_count=p, hero_echo=h)
+        for exp, t, i, p, h in product(hunts.values(), (0, 15), (1, 2), (1, 5), (False, True))
+    ]
+    schedule = [
+        ec.BuffWindow(start, start + 240, name, value)
+        for start, (name, value) in zip(
+            range(0, 60 * 24 * 14, 300),
+            [("item_buff", 2), ("hero_echo", True), ("transform_item", 15)] * 100,
+        )
+    ]
+    return [
+        ("_remaining_exp", lambda: [ec._remaining_exp(*s) for s in scenarios]),
+        ("calculate_time_for_lvl", lambda: [
+            ec.calculate_time_for_lvl(*s, rate) for s in scenarios for rate in rates
+        ]),
+        ("plan_hunts", lambda: [
+            ec.plan_hunts(hunts, *s, item_buffs=(1, 2, 3), transform_items=(0, 10, 15))[0]
+            for s in scenarios
+        ]),
+        ("simulate_buff_schedule", lambda: [
+            ec.simulate_buff_schedule(*s, int(exp), schedule).time_in_min
+            for s in scenarios for exp in hunts.values()
+        ]),
+    ]
+
+def _reference_pet(values):
+    chances = pc.calculate_chances(pc.get_distribution_dict(*values, engine="python"))
+    return {
+        "formatted": (
+            pc.formatted_distribution(chances, True, "base_chance"),
+            pc.formatted_distribution(chances, False, "encounter_chance"),
+        ),
+        "min_hp": (pc.get_min_hp(chances, True), pc.get_min_hp(chances, False)),
+    }
+
+def _reference_remaining_exp(current_lvl, current_per, desired_lvl):
+    # The loop _remaining_exp used before exp_prefix
+    current_lvl = min(current_lvl, 149)
+    desired_lvl = min(desired_lvl, 149)
+    if current_lvl >= desired_lvl:
+        return 0
+    remaining_exp = int(ec.exp_table[current_lvl] * ((100 - current_per) / 100))
+    for i in range(current_lvl + 1, desired_lvl):
+        remaining_exp += ec.exp_table[i]
+    return remaining_exp
+
+def _pet_mismatches(name, results, reference):
+    expected = reference["formatted"]
+    checks = [
+        ("formatted_distribution", results["formatted_distribution"], expected),
+        ("get_min_hp", results["get_min_hp"], reference["min_hp"]),
+        ("formatted_pet_distribution", results["formatted_pet_distribution"], expected),
+        ("get_max_base_distribution", results["get_max_base_distribution"], expected[0]),
+    ]
+    return [f"{stage}: {name}" for stage, got, want in checks if got != want]
+
+def _digest(h, result):
+    if isinstance(result, tuple):
+        for part in result:
+            _digest(h, part)
+    else:
+        h.update(repr(result).encode("utf-8"))
+
+class StageStats:
+    __slots__ = ("seconds", "calls", "peak_bytes", "net_blocks", "digest")
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.calls = 0
+        self.peak_bytes = 0
+        self.net_blocks = 0
+        self.digest = hashlib.sha1()
+
+    def to_json(self):
+        return {
+            "seconds": self.seconds,
+            "calls": self.calls,
+            "peak_bytes": self.peak_bytes,
+            "net_blocks": self.net_blocks,
+            "digest": None if self.digest is None else self.digest.hexdigest(),
+        }
+
+def _run(stages, results, stats, timings, memory):
+    for stage, func in stages:
+        if memory:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            blocks = sys.getallocatedblocks()
+            results[stage] = func(results)
+            _, peak = tracemalloc.get_traced_memory()
+            s = stats[stage]
+            s.peak_bytes = max(s.peak_bytes, peak - before)
+            s.net_blocks = max(s.net_blocks, sys.getallocatedblocks() - blocks)
+        else:
+            start = time.perf_counter()
+            results[stage] = func(results)
+            timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
+def run_benchmark(pets, hunts, repeat=1, memory=True, check=True, progress=None):
+    pet_stages = _pet_stages()
+    exp_stages = [(stage, lambda r, f=f: f()) for stage, f in _exp_stages(hunts)]
+    stats = {stage: StageStats() for stage, _ in pet_stages + exp_stages}
+    for stage in UNHASHED:
+        stats[stage].digest = None
+    mismatches = []
+
+    # Warm the lazily built tables so the first pet does not pay for them
+    pc.get_pet_distribution(*next(iter(pets.values())))
+    pc.get_max_base_distribution(*next(iter(pets.values())))
+
+    for attempt in range(repeat):
+        timings = {}
+        for n, (name, values) in enumerate(pets.items()):
+            results = {"values": values}
+            _run(pet_stages, results, stats, timings, memory=False)
+            if attempt == 0:
+                for stage, _ in pet_stages:
+                    stats[stage].calls += 1
+                    if stats[stage].digest is not None:
+                        _digest(stats[stage].digest, results[stage])
+                if check:
+                    mismatches += _pet_mismatches(name, results, _reference_pet(values))
+            if progress is not None:
+                progress(f"pass {attempt + 1}/{repeat} pet {n + 1}/{len(pets)}")
+        results = {}
+        _run(exp_stages, results, stats, timings, memory=False)
+        if attempt == 0:
+            for stage, _ in exp_stages:
+                stats[stage].calls += 1
+                _digest(stats[stage].digest, tuple(results[stage]))
+        for stage, seconds in timings.items():
+            if attempt == 0 or seconds < stats[stage].seconds:
+                stats[stage].seconds = seconds
+
+    if check:
+        for values in EDGE_VALUES:
+            chances = pc.calculate_chances(pc.get_distribution_dict(*values, engine="python"))
+            fast = pc.get_max_base_distribution(*values)
+            if (
+                pc.formatted_distribution(fast, True, "base_chance") != pc.formatted_distribution(chances, True, "base_chance")
+                or pc.get_max_base_min_hp(*values) != pc.get_min_hp(chances, True)
+            ):
+                mismatches.append(f"get_max_base_distribution: {values}")
+        scenarios = _exp_scenarios()
+        if [ec._remaining_exp(*s) for s in scenarios] != [_reference_remaining_exp(*s) for s in scenarios]:
+            mismatches.append("_remaining_exp")
+
+    if memory:
+        tracemalloc.start()
+        try:
+            for n, values in enumerate(pets.values()):
+                _run(pet_stages, {"values": values}, stats, None, memory=True)
+                if progress is not None:
+                    progress(f"memory pet {n + 1}/{len(pets)}")
+            _run(exp_stages, {}, stats, None, memory=True)
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "calculator_version": pc.get_calculator_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pets": len(pets),
+        "repeat": repeat,
+        "memory": memory,
+        "checked": check,
+        "mismatches": mismatches,
+        "stages": {stage: s.to_json() for stage, s in stats.items()},
+    }
+
+def compare(report, baseline, threshold=0.2):
+    """Lines describing every regression of report against baseline"""
+    regressions = []
+    for stage, new in report["stages"].items():
+        old = baseline.get("stages", {}).get(stage)
+        if old is None:
+            continue
+        if report["pets"] == baseline.get("pets") and new["digest"] is not None and new["digest"] != old["digest"]:
+            regressions.append(f"{stage}: output changed")
+        if new["seconds"] > old["seconds"] * (1 + threshold) and new["seconds"] - old["seconds"] > MIN_SECONDS:
+            regressions.append(f"{stage}: {old['seconds']:.3f}s -> {new['seconds']:.3f}s")
+        if (
+            report["memory"] and baseline.get("memory")
+            and new["peak_bytes"] > old["peak_bytes"] * (1 + threshold)
+            and new["peak_bytes"] - old["peak_bytes"] > MIN_BYTES
+        ):
+            regressions.append(f"{stage}: peak {old['peak_bytes']:,} -> {new['peak_bytes']:,} bytes")
+    return regressions
+
+def print_table(report, baseline=None, file=sys.stdout):
+    print(f"{'stage':<28}{'seconds':>10}{'per call':>12}{'peak':>14}{'blocks':>10}{'vs base':>9}", file=file)
+    for stage, s in report["stages"].items():
+        per_call = s["seconds"] / s["calls"] * 1000 if s["calls"] else 0
+        ratio = ""
+        old = (baseline or {}).get("stages", {}).get(stage)
+        if old and old["seconds"]:
+            ratio = f"{s['seconds'] / old['seconds']:.2f}x"
+        print(
+            f"{stage:<28}{s['seconds']:>10.3f}{per_call:>10.2f}ms{s['peak_bytes']:>14,}{s['net_blocks']:>10,}{ratio:>9}",
+            file=file,
+        )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pet and exp calculators")
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown, 0.2 = 20%%")
+    parser.add_argument("--repeat", type=int, default=1, help="timing passes, the best one is kept")
+    parser.add_argument("--limit", type=int, help="only the first N pets")
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="skip the tracemalloc pass")
+    parser.add_argument("--no-check", dest="check", action="store_false", help="skip the reference comparison")
+    parser.add_argument("--pets", default=PET_DATA_PATH)
+    parser.add_argument("--hunts", default=HUNT_DATA_PATH)
+    args = parser.parse_args(argv)
+
+    pets = load_pet_presets(args.pets)
+    if args.limit is not None:
+        pets = dict(list(pets.items())[:args.limit])
+    hunts = load_hunt_presets(args.hunts)
+
+    def progress(message):
+        print(f"\r{message}", end="", file=sys.stderr, flush=True)
+
+    report = run_benchmark(pets, hunts, args.repeat, args.memory, args.check, progress)
+    print(file=sys.stderr)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_table(report, baseline)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    failures = [f"differs from reference: {m}" for m in report["mismatches"]]
+    if baseline is not None:
+        failures += compare(report, baseline, args.threshold)
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,7 @@
+import math
+from collections import namedtuple
 from datetime import datetime, timedelta
+from itertools import accumulate, product
 
 exp_table: list = [
     0, 2, 6, 18, 37, 67, 110, 170, 246,
@@ -19,26 +22,26 @@ exp_table: list = [
     500000000
 ]
 
+# exp_prefix[i] == sum(exp_table[:i]), so any run of levels is one subtraction
+exp_prefix: list = [0, *accumulate(exp_table)]
+
+def level_range_exp(from_lvl: int, to_lvl: int):
+    """Exp of every full level from from_lvl up to (not including) to_lvl"""
+    return exp_prefix[to_lvl] - exp_prefix[from_lvl]
+
 def get_exp_buff_formula():
     return "[(경험치) * (파티 보너스) * (경구 or 케이크) + (변신템) + (나뭇가지)] * (영메)"
 
-def calculate_exp_buff(
-    exp: int,
-    transform_item: int = 0,
-    event: int = 0,
-    item_buff: int = 1, # cake, 2x exp orb, etc
-    party_count: int = 1,
-    newbie_item: bool=False,
-    hero_echo: bool=False,
-):
-    party_buff = [1, 1, 1.1, 1.15, 1.20, 1.25]
-    total_exp = 0
+party_buff: list = [1, 1, 1.1, 1.15, 1.20, 1.25]
 
+def _party_exp(exp, party_count: int):
     if party_count < 1: party_count = 1
     if party_count > 5: party_count = 5
+    return exp * party_buff[party_count]
 
-    # apply party buff
-    exp = exp * party_buff[party_count]
+def _apply_buffs(exp, transform_item: int, event: int, item_buff: int, newbie_item: bool, hero_echo: bool):
+    """Everything in calculate_exp_buff after the party buff, exp already has it applied"""
+    total_exp = 0
 
     # calculate additive buff - transformation + newbie item
     # i.e. if transform_item == 15, exp *= 1.15
@@ -53,15 +56,29 @@ def calculate_exp_buff(
 
     return total_exp
 
+def calculate_exp_buff(
+    exp: int,
+    transform_item: int = 0,
+    event: int = 0,
+    item_buff: int = 1, # cake, 2x exp orb, etc
+    party_count: int = 1,
+    newbie_item: bool=False,
+    hero_echo: bool=False,
+):
+    return _apply_buffs(_party_exp(exp, party_count), transform_item, event, item_buff, newbie_item, hero_echo)
+
+def check_level_range(current_lvl: int, current_per: float, desired_lvl: int):
+    """Raise ValueError unless the levels are 1..150 and the percent 0..100, the ranges the exp tab allows"""
+    if not (1 <= current_lvl <= 150 and 1 <= desired_lvl <= 150 and 0 <= current_per <= 100):
+        raise ValueError(f"levels must be 1..150 and percent 0..100: {current_lvl} {current_per} {desired_lvl}")
+
 def _remaining_exp(current_lvl: int, current_per: float, desired_lvl: int):
     current_lvl = min(current_lvl, 149)
     desired_lvl = min(desired_lvl, 149)
     if current_lvl >= desired_lvl:
         return 0
     remaining_exp = int(exp_table[current_lvl] * ((100 - current_per) / 100))
-    for i in range((current_lvl+1), desired_lvl):
-        remaining_exp += exp_table[i]
-    return remaining_exp
+    return remaining_exp + level_range_exp(current_lvl + 1, desired_lvl)
 
 def calculate_time_for_lvl(current_lvl: int, current_per: float, desired_lvl: int, exp_per_hour: int):
     if exp_per_hour == 0:
@@ -76,6 +93,8 @@ def calculate_time_for_lvl(current_lvl: int, current_per: float, desired_lvl: in
     return required_time_in_min
 
 def _format_time(total_minutes: float):
+    if total_minutes == math.inf:
+        return "도달 불가"
     days = total_minutes // (24 * 60)
     hours = (total_minutes % (24 * 60)) // 60
     minutes = total_minutes % 60
@@ -108,4 +127,149 @@ def format_result(current_lvl: int, current_per: float, desired_lvl: int, time_i
         필요 시간 : {_format_time(time_in_min)}
 
         레벨 달성 날짜: {new_time.strftime("%Y-%m-%d %H:%M")}
-    """
\ No newline at end of file
+    """
+
+PlanRow = namedtuple("PlanRow", [
+    "hunt", "party_count", "item_buff", "transform_item", "newbie_item", "hero_echo",
+    "exp_per_hour", "time_in_min",
+])
+
+def plan_hunts(
+    hunts: dict,
+    current_lvl: int,
+    current_per: float,
+    desired_lvl: int,
+    party_counts=range(1, 6),
+    item_buffs=(1, 2),
+    transform_items=(0,),
+    newbie_items=(False, True),
+    hero_echos=(False, True),
+    event: int = 0,
+):
+    """
+    Time to desired_lvl for every hunt x party x item x transform x newbie x
+    hero combination, fastest first. hunts maps a hunting ground to its exp
+    per hour, like load_hunt_presets(). Same numbers as calculate_exp_buff and
+    calculate_time_for_lvl for each setup, except that a setup earning no exp
+    takes math.inf (sorted last) instead of 0.
+    """
+    remaining_exp = _remaining_exp(current_lvl, current_per, desired_lvl)
+
+    rows = []
+    for (hunt, exp), party_count in product(((h, int(e)) for h, e in hunts.items()), party_counts):
+        # The party step is shared by every item combination
+        exp = _party_exp(exp, party_count)
+        for item_buff, transform_item, newbie_item, hero_echo in product(
+            item_buffs, transform_items, newbie_items, hero_echos
+        ):
+            total_exp = _apply_buffs(exp, transform_item, event, item_buff, newbie_item, hero_echo)
+            if not remaining_exp:
+                time_in_min = 0
+            elif total_exp > 0:
+                time_in_min = remaining_exp / (total_exp / 60)
+            else:
+                time_in_min = math.inf
+            rows.append(PlanRow(
+                hunt, party_count, item_buff, transform_item, newbie_item, hero_echo, total_exp, time_in_min,
+            ))
+    rows.sort(key=lambda row: row.time_in_min)
+    return rows
+
+BuffWindow = namedtuple("BuffWindow", ["start", "end", "name", "value"])
+BuffTimeline = namedtuple("BuffTimeline", ["time_in_min", "level_ups"])
+
+def _buff_segments(base: dict, schedule):
+    """
+    Yield (start, end, calculate_exp_buff kwargs) for the stretches where no
+    window starts or ends. The last one has end None and runs forever.
+    """
+    events = []
+    for order, window in enumerate(schedule):
+        start, end = max(window.start, 0), max(window.end, 0)
+        if end > start:
+            events.append((start, 1, order, window))
+            events.append((end, -1, order, window))
+    # Everything at one time is applied before that stretch is yielded, so ties can sort any way
+    events.sort(key=lambda event: event[:3])
+
+    # name -> {(start, schedule order): value} of its open windows, the one opened last
+    # holds (later in the schedule on a tie), the base value once none is open
+    active = {}
+    state = dict(base)
+    start = 0
+    i = 0
+    while True:
+        while i < len(events) and events[i][0] <= start:
+            _, delta, order, window = events[i]
+            windows = active.setdefault(window.name, {})
+            key = (max(window.start, 0), order)
+            if delta > 0:
+                windows[key] = window.value
+            else:
+                del windows[key]
+            state[window.name] = windows[max(windows)] if windows else base[window.name]
+            i += 1
+        end = events[i][0] if i < len(events) else None
+        yield start, end, state
+        if end is None:
+            return
+        start = end
+
+def simulate_buff_schedule(
+    current_lvl: int,
+    current_per: float,
+    desired_lvl: int,
+    exp: int,
+    schedule=(),
+    transform_item: int = 0,
+    event: int = 0,
+    item_buff: int = 1,
+    party_count: int = 1,
+    newbie_item: bool = False,
+    hero_echo: bool = False,
+):
+    """
+    Time to desired_lvl when buffs only last part of the session.
+
+    schedule holds BuffWindow(start, end, name, value) in minutes from now,
+    name being a calculate_exp_buff argument that takes value while the
+    window is open, also when that is lower than outside it. Where windows
+    of one argument overlap, the one opened last holds. The other arguments
+    are what holds outside the windows.
+    Exp grows linearly inside each stretch between window edges, so level ups
+    are solved per stretch instead of stepping through time.
+
+    Returns BuffTimeline(time_in_min, [(level, minute reached), ...]), with
+    time_in_min None if the target is never reached. Without windows the
+    time equals calculate_time_for_lvl.
+    """
+    current_lvl = min(current_lvl, 149)
+    desired_lvl = min(desired_lvl, 149)
+    if current_lvl >= desired_lvl:
+        return BuffTimeline(0, [])
+
+    base = {
+        "exp": exp, "transform_item": transform_item, "event": event, "item_buff": item_buff,
+        "party_count": party_count, "newbie_item": newbie_item, "hero_echo": hero_echo,
+    }
+    # Exp counted from level 0, level L is reached at exp_prefix[L]
+    total = exp_prefix[current_lvl + 1] - int(exp_table[current_lvl] * ((100 - current_per) / 100))
+    next_lvl = current_lvl + 1
+    level_ups = []
+    rates = {}  # the same few buff combinations keep coming back
+    for start, end, state in _buff_segments(base, schedule):
+        key = tuple(state.values())
+        exp_per_min = rates.get(key)
+        if exp_per_min is None:
+            exp_per_min = rates[key] = calculate_exp_buff(**state) / 60
+        if exp_per_min <= 0:
+            if end is None:
+                return BuffTimeline(None, level_ups)
+            continue
+        gained = None if end is None else (end - start) * exp_per_min
+        while next_lvl <= desired_lvl and (gained is None or exp_prefix[next_lvl] - total <= gained):
+            level_ups.append((next_lvl, start + (exp_prefix[next_lvl] - total) / exp_per_min))
+            next_lvl += 1
+        if next_lvl > desired_lvl:
+            return BuffTimeline(level_ups[-1][1], level_ups)
+        total += gained
@@ -0,0 +1,188 @@
+'''
+Search over dropdown labels (pet names, hunting grounds).
+
+A query matches a label as a substring, where a lone consonant such as ㄷ
+stands for any syllable starting with it (초성 search, "ㄷㄹ" finds 두리), and
+the last syllable may still be mid-composition ("둘" finds 두리 the way the
+IME shows it while 두리 is being typed). Labels that only contain the query
+characters in order are returned after the substring matches.
+
+Results are ranked exact match, then match at the start, then by position,
+then shorter labels first. LabelIndex keeps, for every character, the labels
+containing it. A single character is answered from that table alone, longer
+queries only check the labels that hold all of their characters (and that
+matched the previous query, when this one extends it).
+'''
+
+import heapq
+import re
+from collections import defaultdict
+
+CHOSEONG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+JONGSEONG = ("", "ㄱ", "ㄲ", "ㄳ", "ㄴ", "ㄵ", "ㄶ", "ㄷ", "ㄹ", "ㄺ", "ㄻ", "ㄼ", "ㄽ", "ㄾ",
+             "ㄿ", "ㅀ", "ㅁ", "ㅂ", "ㅄ", "ㅅ", "ㅆ", "ㅇ", "ㅈ", "ㅊ", "ㅋ", "ㅌ", "ㅍ", "ㅎ")
+# Final consonant -> (what stays on the syllable, what starts the next one)
+_SPLIT_JONG = {
+    "ㄳ": ("ㄱ", "ㅅ"), "ㄵ": ("ㄴ", "ㅈ"), "ㄶ": ("ㄴ", "ㅎ"), "ㄺ": ("ㄹ", "ㄱ"),
+    "ㄻ": ("ㄹ", "ㅁ"), "ㄼ": ("ㄹ", "ㅂ"), "ㄽ": ("ㄹ", "ㅅ"), "ㄾ": ("ㄹ", "ㅌ"),
+    "ㄿ": ("ㄹ", "ㅍ"), "ㅀ": ("ㄹ", "ㅎ"), "ㅄ": ("ㅂ", "ㅅ"),
+}
+_SYLLABLE_FIRST = 0xAC00
+_SYLLABLE_LAST = 0xD7A3
+
+def _is_syllable(ch):
+    return _SYLLABLE_FIRST <= ord(ch) <= _SYLLABLE_LAST
+
+def _open_syllable(ch):
+    # 둘 -> 두, everything the syllable could still become while it is being typed
+    return chr(ord(ch) - (ord(ch) - _SYLLABLE_FIRST) % 28)
+
+def _keys(ch):
+    if _is_syllable(ch):
+        return ch, CHOSEONG[(ord(ch) - _SYLLABLE_FIRST) // 588], _open_syllable(ch)
+    return (ch,)
+
+def _choseong_class(jamo):
+    # The consonant itself or any syllable that starts with it
+    first = _SYLLABLE_FIRST + CHOSEONG.index(jamo) * 588
+    return f"[{jamo}{chr(first)}-{chr(first + 587)}]"
+
+def _char_pattern(ch):
+    if ch in CHOSEONG:
+        return _choseong_class(ch)
+    return re.escape(ch)
+
+def _last_char_pattern(ch):
+    # The syllable being typed may still grow a final consonant, or lose it to the next syllable
+    if not _is_syllable(ch):
+        return _char_pattern(ch)
+    offset = ord(ch) - _SYLLABLE_FIRST
+    jong = JONGSEONG[offset % 28]
+    if not jong:
+        return f"[{ch}-{chr(ord(ch) + 27)}]"
+    kept, moved = _SPLIT_JONG.get(jong, ("", jong))
+    if moved not in CHOSEONG:
+        return re.escape(ch)
+    base = chr(ord(ch) - offset % 28 + JONGSEONG.index(kept))
+    return f"(?:{re.escape(ch)}|{re.escape(base)}{_choseong_class(moved)})"
+
+def _choseong_string(label):
+    # Syllables replaced by their 초성, so a 초성 only query is a plain substring search
+    return "".join(CHOSEONG[(ord(ch) - _SYLLABLE_FIRST) // 588] if _is_syllable(ch) else ch for ch in label)
+
+def _find_in_order(text, query):
+    # Position of the first query character if all of them appear in order, else -1
+    start = pos = text.find(query[0])
+    for ch in query[1:]:
+        if pos < 0:
+            break
+        pos = text.find(ch, pos + 1)
+    return start if pos >= 0 else -1
+
+def _start(match):
+    return -1 if match is None else match.start()
+
+def compile_query(query):
+    """(substring pattern, in-order pattern) for a casefolded, stripped, non-empty query"""
+    # No re.IGNORECASE, case folding the 초성 ranges costs more than the whole search
+    parts = [_char_pattern(ch) for ch in query[:-1]] + [_last_char_pattern(query[-1])]
+    return re.compile("".join(parts)), re.compile(".*?".join(parts))
+
+class LabelIndex:
+    def __init__(self, labels):
+        self.labels = list(labels)
+        self._folded = [label.casefold() for label in self.labels]
+        self._choseong = [_choseong_string(label) for label in self._folded]
+        self._last_query = ""
+        self._last_candidates = range(len(self.labels))
+        # key -> {label index: first position}, keys are characters, their 초성 and open syllable
+        self._postings = defaultdict(dict)
+        for i, label in enumerate(self._folded):
+            for pos, ch in enumerate(label):
+                for key in _keys(ch):
+                    self._postings[key].setdefault(i, pos)
+
+    def _posting(self, ch, last):
+        # Superset of the labels that can match query character ch
+        if last and _is_syllable(ch):
+            ch = _open_syllable(ch)
+        return self._postings.get(ch, {})
+
+    def _rank(self, ranked, limit):
+        if limit is None:
+            ranked.sort()
+        else:
+            ranked = heapq.nsmallest(limit, ranked)
+        return [self.labels[i] for _, _, _, i in ranked]
+
+    def search(self, query, limit=None):
+        """Labels matching query, best first"""
+        query = query.strip().casefold()
+        if not query:
+            self._last_query = ""
+            self._last_candidates = range(len(self.labels))
+            return self.labels[:limit]
+
+        last = query[-1]
+        if len(query) == 1 and not (_is_syllable(last) and _open_syllable(last) != last):
+            # The posting is exactly the matching labels, with the match position
+            posting = self._posting(last, True)
+            labels = self._folded
+            self._last_query = query
+            self._last_candidates = list(posting)
+            return self._rank(
+                [
+                    (0 if labels[i] == query else 1 if pos == 0 else 2, pos, len(labels[i]), i)
+                    for i, pos in posting.items()
+                ],
+                limit,
+            )
+
+        # Every match contains every query character, and extends the previous query's matches
+        postings = sorted(
+            (self._posting(ch, k == len(query) - 1) for k, ch in enumerate(query)),
+            key=len,
+        )
+        candidates = postings[0].keys()
+        if query.startswith(self._last_query) and len(self._last_candidates) < len(candidates):
+            candidates = self._last_candidates
+        candidates = set(candidates)
+        for posting in postings:
+            candidates.intersection_update(posting.keys())
+
+        labels = self._folded
+        if not any(map(_is_syllable, query)):
+            # 초성, latin and digits only, match on the 초성 strings without a regex
+            choseong = self._choseong
+            find = lambda i: choseong[i].find(query)
+            find_in_order = lambda i: _find_in_order(choseong[i], query)
+        else:
+            substring, in_order = compile_query(query)
+            find = lambda i: _start(substring.search(labels[i]))
+            find_in_order = lambda i: _start(in_order.search(labels[i]))
+
+        ranked = []
+        missed = []
+        for i in candidates:
+            start = find(i)
+            if start < 0:
+                missed.append(i)
+            else:
+                ranked.append((0 if labels[i] == query else 1 if start == 0 else 2, start, len(labels[i]), i))
+
+        if limit is not None and len(ranked) >= limit:
+            # In-order matches rank last and cannot make the cut, the next query rechecks them
+            self._last_candidates = candidates
+        else:
+            in_order_ranked = []
+            for i in missed:
+                start = find_in_order(i)
+                if start >= 0:
+                    in_order_ranked.append((3, start, len(labels[i]), i))
+            ranked.extend(in_order_ranked)
+            self._last_candidates = [i for _, _, _, i in ranked]
+        self._last_query = query
+        return self._rank(ranked, limit)
+
+    def __len__(self):
+        return len(self.labels)
@@ -0,0 +1,120 @@
+'''
+Load generator for pet_service.py.
+
+    python pet_service.py &
+    python load_test.py --requests 2000 --concurrency 32
+
+Keeps --concurrency keep-alive connections busy with a mix of pet requests
+(random presets from pet_data.txt, so repeats hit the cache or coalesce) and
+exp requests, then prints latency percentiles and requests per second.
+'''
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from pet_service import DEFAULT_PORT
+from presets import load_pet_presets
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+def make_requests(count, pet_share=0.5, pets=None, seed=0):
+    """(path, body) pairs, pets picked from pet_data.txt"""
+    rng = random.Random(seed)
+    names = list(pets if pets is not None else load_pet_presets())
+    requests = []
+    for _ in range(count):
+        if rng.random() < pet_share:
+            body = {"name": rng.choice(names), "limit": 20}
+            requests.append(("/pet", body))
+        else:
+            current_lvl = rng.randint(1, 140)
+            body = {
+                "exp": rng.choice([560000, 680000, 700000, 840000]),
+                "current_lvl": current_lvl,
+                "current_per": rng.choice([0, 25, 50]),
+                "desired_lvl": rng.randint(current_lvl + 1, 149),
+                "party_count": rng.randint(1, 5),
+                "item_buff": rng.choice([1, 2]),
+            }
+            requests.append(("/exp", body))
+    return requests
+
+async def _client(host, port, queue, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            try:
+                path, body = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            start = time.perf_counter()
+            writer.write(
+                f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(payload)}\r\n\r\n".encode("latin-1") + payload
+            )
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+async def run_load(host, port, requests, concurrency):
+    queue = asyncio.Queue()
+    for request in requests:
+        queue.put_nowait(request)
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _client(host, port, queue, latencies, errors) for _ in range(min(concurrency, len(requests)))
+    ))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "seconds": elapsed,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test pet_service.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--pet-share", type=float, default=0.5, help="fraction of requests that are pets")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    args = parser.parse_args(argv)
+
+    requests = make_requests(args.requests, args.pet_share, seed=args.seed)
+    result = asyncio.run(run_load(args.host, args.port, requests, args.concurrency))
+    if args.json:
+        print(json.dumps(result))
+    else:
+        print(f"requests {result['requests']}  errors {result['errors']}  {result['seconds']:.2f}s")
+        print(f"rps {result['rps']:.1f}  p50 {result['p50_ms']:.2f} ms  p99 {result['p99_ms']:.2f} ms  max {result['max_ms']:.2f} ms")
+
+if __name__ == "__main__":
+    main()
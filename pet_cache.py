@@ -0,0 +1,168 @@
+'''
+Two tier cache for pet calculations.
+
+Results of get_pet_distribution are kept in a small in-memory LRU, backed by
+a sqlite file that survives restarts. Disk entries are stored together with
+get_calculator_version(), so changing compute_derived or the A/B tables
+makes old entries invisible (they are dropped the next time the file is
+opened).
+'''
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from pet_calculator import PetDistribution, get_pet_distribution, get_calculator_version
+
+DEFAULT_CACHE_PATH = "pet_cache.sqlite3"
+
+class LRUCache:
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            return default
+        return self._data[key]
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+class PetCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, memory_size=128, disk_limit=32 * 1024 * 1024):
+        """
+        path: sqlite file for the disk tier, None to keep everything in memory
+        memory_size: number of pets kept in the LRU
+        disk_limit: bytes of result data kept on disk before evicting
+        """
+        self.version = get_calculator_version()
+        self.memory = LRUCache(memory_size)
+        self.disk_limit = disk_limit
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "version TEXT, key TEXT, data BLOB, size INTEGER, last_used REAL, "
+                "PRIMARY KEY (version, key))"
+            )
+            self._db.execute("DELETE FROM results WHERE version != ?", (self.version,))
+            self._db.commit()
+
+    @staticmethod
+    def make_key(i_base, i_hp, i_at, i_df, i_sp):
+        return f"{i_base},{i_hp},{i_at},{i_df},{i_sp}"
+
+    def get(self, i_base, i_hp, i_at, i_df, i_sp):
+        """Cached get_pet_distribution"""
+        key = self.make_key(i_base, i_hp, i_at, i_df, i_sp)
+        with self._lock:
+            result = self.memory.get(key)
+            if result is not None:
+                self.memory_hits += 1
+                return result
+
+            result = self._load(key)
+            if result is not None:
+                self.disk_hits += 1
+                self.memory.put(key, result)
+                return result
+
+        result = get_pet_distribution(i_base, i_hp, i_at, i_df, i_sp)
+        with self._lock:
+            self.misses += 1
+            self.memory.put(key, result)
+            self._store(key, result)
+        return result
+
+    def _load(self, key):
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT data FROM results WHERE version = ? AND key = ?", (self.version, key)
+        ).fetchone()
+        if row is None:
+            return None
+        self._db.execute(
+            "UPDATE results SET last_used = ? WHERE version = ? AND key = ?",
+            (time.time(), self.version, key)
+        )
+        self._db.commit()
+        return PetDistribution.from_buffer(row[0])
+
+    def _store(self, key, result):
+        if self._db is None:
+            return
+        data = result.to_bytes()
+        self._db.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+            (self.version, key, data, len(data), time.time())
+        )
+        self._evict(self.disk_limit)
+        self._db.commit()
+
+    def _evict(self, max_bytes):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= max_bytes:
+            return
+        rows = self._db.execute("SELECT key, size FROM results ORDER BY last_used").fetchall()
+        for key, size in rows:
+            if total <= max_bytes:
+                break
+            self._db.execute("DELETE FROM results WHERE version = ? AND key = ?", (self.version, key))
+            total -= size
+
+    def evict(self, max_bytes):
+        """Shrink the disk tier to at most max_bytes, least recently used first"""
+        if self._db is None:
+            return
+        with self._lock:
+            self._evict(max_bytes)
+            self._db.commit()
+
+    def disk_size(self):
+        if self._db is None:
+            return 0
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self.memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+                self._db.commit()
+
+    def stats(self):
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_entries": len(self.memory),
+            "disk_bytes": self.disk_size(),
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
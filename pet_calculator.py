@@ -22,28 +22,38 @@ Features:
 '''
 
 import math
-from functools import reduce
+import heapq
+import struct
+from array import array
+from collections.abc import Mapping
+from functools import reduce, lru_cache
 from operator import mul
 from itertools import product
+from bisect import bisect_left, bisect_right
 from collections import defaultdict
-from decimal import Decimal, getcontext
+# fractions, hashlib and importlib.util are imported where they are used and
+# the A/B tables are built on first access, so importing this module is cheap
 
-getcontext().prec = 50  # Set high enough precision
-
-DEBUG=False
-
-def print_debug(s):
-    if DEBUG is True:
-        print(s)
+import profiling
 
 def round_to_significant(x, sig=3):
     if x == 0:
         return 0
     else:
+        x = float(x)  # exact chances come in as Fraction
         return round(x, sig - int(math.floor(math.log10(abs(x)))) - 1)
 
+def _compositions(total, buckets):
+    # Ascending order, same as filtering product(range(total + 1), repeat=buckets)
+    if buckets == 1:
+        yield (total,)
+        return
+    for first in range(total + 1):
+        for rest in _compositions(total - first, buckets - 1):
+            yield (first,) + rest
+
 def generate_distribution_combinations(total=10, buckets=4):
-    return [combo for combo in product(range(total + 1), repeat=buckets) if sum(combo) == total]
+    return list(_compositions(total, buckets))
 
 def generate_signed_combinations(slots=4, values=range(-2, 3)):
     return list(product(values, repeat=slots))
@@ -67,57 +77,665 @@ def compute_derived(s, i_base):
         int(speed)
     )
 
+# Rows are hp, attack, defense, speed; columns are the scaled HP, Att, Def, Agi.
+# compute_derived is this table written out, keep the two in sync.
+DERIVED_COEFFICIENTS = (
+    (4, 1, 1, 1),
+    (0.1, 1, 0.1, 0.05),
+    (0.1, 0.1, 1, 0.05),
+    (0, 0, 0, 1),
+)
+
+def compute_derived_table(s, i_base, coefficients):
+    """compute_derived for any coefficient table, summed in the same order"""
+    scaled = [x * i_base / 100 for x in s]
+    derived = []
+    for row in coefficients:
+        value = scaled[0] * row[0]
+        for x, c in zip(scaled[1:], row[1:]):
+            value = value + x * c
+        derived.append(int(value))
+    return tuple(derived)
+
+def get_derive(coefficients=DERIVED_COEFFICIENTS):
+    # compute_derived itself for the default table, it is the hot path
+    if coefficients is DERIVED_COEFFICIENTS:
+        return compute_derived
+    return lambda s, i_base: compute_derived_table(s, i_base, coefficients)
+
+def compute_dist_weight(x_tuple):
+    # Number of ways to roll this dist, out of len(x_tuple) ** sum(x_tuple)
+    numerator = math.factorial(sum(x_tuple))
+    denominator = reduce(mul, (math.factorial(x) for x in x_tuple))
+    return numerator // denominator
+
 def compute_dist_prob(x_tuple):
     n = sum(x_tuple)
     k = len(x_tuple)
-    numerator = math.factorial(n)
-    denominator = reduce(mul, (math.factorial(x) for x in x_tuple))
-    probability = (numerator / denominator) * (1 / k) ** n
-    return probability
-
-A = generate_distribution_combinations()
-B = generate_signed_combinations()
+    weight = get_tables().weights.get(x_tuple)
+    if weight is None:
+        weight = compute_dist_weight(x_tuple)
+    return weight / k ** n
+
+DEFAULT_MODIFIERS = range(-2, 3)
+
+class Tables:
+    """
+    Everything a ruleset needs: bonus point distributions (A), base modifiers
+    (B), the exact weight of each dist over total_weight rolls and the max base
+    modifier. One instance per ruleset, so it can key other caches by identity.
+    """
+
+    __slots__ = ("dists", "mods", "weights", "total_weight", "max_mod")
+
+    def __init__(self, dists, mods, weights, total_weight, max_mod):
+        self.dists = dists
+        self.mods = mods
+        self.weights = weights
+        self.total_weight = total_weight
+        self.max_mod = max_mod
+
+@lru_cache(maxsize=None)
+def _build_tables(total, buckets, modifiers):
+    dists = generate_distribution_combinations(total, buckets)
+    mods = generate_signed_combinations(buckets, modifiers)
+    weights = {dist: compute_dist_weight(dist) for dist in dists}
+    return Tables(dists, mods, weights, buckets ** total, (max(modifiers),) * buckets)
+
+def get_tables(total=10, buckets=4, modifiers=DEFAULT_MODIFIERS):
+    """Tables for a ruleset, built once per (total, buckets, modifiers)"""
+    if buckets != 4:
+        raise ValueError("bonus points are spread over the 4 base stats, buckets must be 4")
+    return _build_tables(total, buckets, tuple(modifiers))
+
+# Module level names for the default ruleset, resolved on first access
+_LAZY_TABLES = {
+    "A": "dists",
+    "B": "mods",
+    "DIST_WEIGHTS": "weights",
+    "DIST_TOTAL_WEIGHT": "total_weight",
+}
+
+def __getattr__(name):
+    if name in _LAZY_TABLES:
+        return getattr(get_tables(), _LAZY_TABLES[name])
+    if name == "DEFAULT_ENGINE":
+        return get_default_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class DistributionDict(defaultdict):
+    """
+    get_distribution_dict result, derived stat -> modifier -> dists. It keeps
+    the Tables it was built from, so chances computed from it use the same
+    ruleset without it being passed again.
+    """
+
+    def __init__(self, tables):
+        super().__init__(lambda: defaultdict(list[tuple]))
+        self.tables = tables
+
+    def copy(self):
+        new = DistributionDict(self.tables)
+        new.update(self)
+        return new
+
+    __copy__ = copy
+
+def _ruleset_tables(stat_to_base, total=None, buckets=None, modifiers=None):
+    # Ruleset arguments when given, else the one the result was built with, else the default
+    if total is None and buckets is None and modifiers is None:
+        tables = getattr(stat_to_base, "tables", None)
+        if tables is not None:
+            return tables
+    return get_tables(
+        10 if total is None else total,
+        4 if buckets is None else buckets,
+        DEFAULT_MODIFIERS if modifiers is None else modifiers,
+    )
 
-def get_distribution_dict(i_base, i_hp, i_at, i_df, i_sp):
+def _get_distribution_dict_python(i_base, i_hp, i_at, i_df, i_sp, tables, coefficients):
     base = [i_hp, i_at, i_df, i_sp]  
+    derive = get_derive(coefficients)
 
     # New structure: derived stat -> set of modifiers
-    derived_to_modifiers = defaultdict(lambda: defaultdict(list[tuple]))
+    derived_to_modifiers = DistributionDict(tables)
 
     # For each modifier, track which stats it's already linked to (optional, avoids extra work)
-    for mod in B:
-        for dist in A:
+    for mod in tables.mods:
+        for dist in tables.dists:
             s = combine_stats(base, dist, mod)
-            derived = compute_derived(s, i_base)
+            derived = derive(s, i_base)
             derived_to_modifiers[derived][mod].append(dist)
     return derived_to_modifiers
 
-def compute_max_base_chance(stat_to_base, stat):
-    if (2,2,2,2) not in stat_to_base[stat].keys():
+@lru_cache(maxsize=None)
+def _get_numpy_grid(tables):
+    # dist + mod does not depend on the pet, so the (4, mods * dists) grid is built once
+    import numpy as np
+    grid = np.asarray(tables.mods)[:, None, :] + np.asarray(tables.dists)[None, :, :]
+    return np.ascontiguousarray(grid.reshape(-1, 4).T)
+
+def _derive_numpy(s, i_base, coefficients=DERIVED_COEFFICIENTS):
+    """compute_derived over the columns of a (4, n) integer array, as a (4, n) int64 array"""
+    import numpy as np
+
+    # Same operation order as compute_derived so the float results (and int() truncation) match
+    scaled = s * i_base / 100
+    s0, s1, s2, s3 = scaled
+    derived = np.empty(s.shape, dtype=np.int64)
+    if coefficients is DERIVED_COEFFICIENTS:
+        derived[0] = s0 * 4 + s1 + s2 + s3
+        derived[1] = s0 * 0.1 + s1 + s2 * 0.1 + s3 * 0.05
+        derived[2] = s0 * 0.1 + s1 * 0.1 + s2 + s3 * 0.05
+        derived[3] = s3
+    else:
+        # Left to right like compute_derived_table
+        for i, row in enumerate(coefficients):
+            value = scaled[0] * row[0]
+            for x, c in zip(scaled[1:], row[1:]):
+                value = value + x * c
+            derived[i] = value
+    return derived
+
+def _get_distribution_dict_numpy(i_base, i_hp, i_at, i_df, i_sp, tables, coefficients):
+    import numpy as np
+
+    A, B = tables.dists, tables.mods
+    n_dist = len(A)
+    grid = _get_numpy_grid(tables)
+    s = grid + np.asarray([i_hp, i_at, i_df, i_sp])[:, None]
+    derived = _derive_numpy(s, i_base, coefficients)
+
+    # Pack each derived tuple into one integer key for grouping
+    low = derived.min(axis=1)
+    span = derived.max(axis=1) - low + 1
+    key = (((derived[0] - low[0]) * span[1] + derived[1] - low[1]) * span[2] + derived[2] - low[2]) * span[3] + derived[3] - low[3]
+
+    # Stable sort keeps mod/dist order inside each group, as appended by the python loop
+    order = np.argsort(key, kind="stable")
+    sorted_key = key[order]
+    mod_of = order // n_dist
+    new_group = np.r_[True, sorted_key[1:] != sorted_key[:-1]]
+    group_starts = np.flatnonzero(new_group)
+
+    # Split each group further wherever the modifier changes
+    run_starts = np.flatnonzero(new_group | np.r_[True, mod_of[1:] != mod_of[:-1]])
+    run_group = np.cumsum(new_group[run_starts]) - 1
+
+    # Insert derived stats in order of first occurrence, so ties sort the same way downstream
+    group_rank = np.empty(len(group_starts), dtype=np.int64)
+    group_rank[np.argsort(order[group_starts], kind="stable")] = np.arange(len(group_starts))
+    run_order = np.argsort(group_rank[run_group], kind="stable")
+
+    group_stats = list(map(tuple, derived[:, order[group_starts]].T.tolist()))
+    dist_idx = (order - mod_of * n_dist).tolist()
+    run_bounds = zip(
+        run_group[run_order].tolist(),
+        mod_of[run_starts[run_order]].tolist(),
+        run_starts[run_order].tolist(),
+        np.r_[run_starts[1:], len(order)][run_order].tolist(),
+    )
+
+    derived_to_modifiers = DistributionDict(tables)
+    get_dist = A.__getitem__
+    for group, mod, start, end in run_bounds:
+        derived_to_modifiers[group_stats[group]][B[mod]] = list(map(get_dist, dist_idx[start:end]))
+    return derived_to_modifiers
+
+DISTRIBUTION_ENGINES = {
+    "python": _get_distribution_dict_python,
+    "numpy": _get_distribution_dict_numpy,
+}
+
+@lru_cache(maxsize=None)
+def get_default_engine():
+    # numpy is optional, fall back to the pure python loop when it is not installed
+    from importlib.util import find_spec
+    return "numpy" if find_spec("numpy") else "python"
+
+def get_distribution_dict(
+    i_base, i_hp, i_at, i_df, i_sp, engine=None,
+    total=10, buckets=4, modifiers=DEFAULT_MODIFIERS, coefficients=DERIVED_COEFFICIENTS,
+):
+    if engine is None:
+        engine = get_default_engine()
+    tables = get_tables(total, buckets, modifiers)
+    with profiling.span("distribution dict"):
+        stat_to_base = DISTRIBUTION_ENGINES[engine](i_base, i_hp, i_at, i_df, i_sp, tables, coefficients)
+    if profiling.enabled:
+        profiling.count("pets")
+        profiling.count("derived stats", len(stat_to_base))
+        profiling.count("modifier sets", sum(map(len, stat_to_base.values())))
+        profiling.count("dists", sum(len(dists) for mods in stat_to_base.values() for dists in mods.values()))
+    return stat_to_base
+
+@lru_cache(maxsize=None)
+def _build_offset_table(tables):
+    totals = {}
+    for mod in tables.mods:
+        is_max = mod == tables.max_mod
+        for dist in tables.dists:
+            offset = (dist[0] + mod[0], dist[1] + mod[1], dist[2] + mod[2], dist[3] + mod[3])
+            entry = totals.get(offset)
+            if entry is None:
+                entry = totals[offset] = [0, 0, 0, 0]
+            weight = tables.weights[dist]
+            entry[0] += 1
+            entry[1] += weight
+            if is_max:
+                entry[2] += 1
+                entry[3] += weight
+    return [(offset, *entry) for offset, entry in totals.items()]
+
+def get_offset_table(total=10, buckets=4, modifiers=DEFAULT_MODIFIERS):
+    """
+    Base independent part of get_distribution_dict.
+
+    Every (mod, dist) pair only moves the base stats by dist + mod, so the
+    pairs are folded into their distinct offset vectors once per ruleset.
+    Each entry is (offset, count, weight, max_count, max_weight) where the
+    max_ fields only count the max base modifier, (2,2,2,2) by default.
+    Entries are ordered by where the offset first shows up in the mod/dist
+    loop, which keeps the derived stat order (and therefore sort ties) the
+    same as get_distribution_dict.
+    """
+    return _build_offset_table(get_tables(total, buckets, modifiers))
+
+def _sum_offsets(i_base, i_hp, i_at, i_df, i_sp, offset_table, derive=compute_derived):
+    # derived stat -> [count, weight, max_count], in get_distribution_dict order
+    totals = {}
+    for (o_hp, o_at, o_df, o_sp), count, weight, max_count, max_weight in offset_table:
+        derived = derive((i_hp + o_hp, i_at + o_at, i_df + o_df, i_sp + o_sp), i_base)
+        entry = totals.get(derived)
+        if entry is None:
+            totals[derived] = [count, weight, max_count]
+        else:
+            entry[0] += count
+            entry[1] += weight
+            entry[2] += max_count
+    return totals
+
+def _profiled_sum_offsets(i_base, i_hp, i_at, i_df, i_sp, tables, coefficients):
+    offset_table = _build_offset_table(tables)
+    with profiling.span("offset sums"):
+        totals = _sum_offsets(i_base, i_hp, i_at, i_df, i_sp, offset_table, get_derive(coefficients))
+    if profiling.enabled:
+        profiling.count("pets")
+        profiling.count("offsets", len(offset_table))
+        profiling.count("derived stats", len(totals))
+    return totals
+
+def get_chance_dict(
+    i_base, i_hp, i_at, i_df, i_sp, exact=False,
+    total=10, buckets=4, modifiers=DEFAULT_MODIFIERS, coefficients=DERIVED_COEFFICIENTS,
+):
+    """
+    Same result as pet_calculate(get_distribution_dict(...)), computed from the
+    offset table instead of every (mod, dist) pair.
+    """
+    tables = get_tables(total, buckets, modifiers)
+    total_weight = len(tables.mods) * tables.total_weight
+    totals = _profiled_sum_offsets(i_base, i_hp, i_at, i_df, i_sp, tables, coefficients)
+    per_dict = defaultdict(lambda: defaultdict(float))
+    for stat, (count, weight, max_count) in totals.items():
+        if exact:
+            from fractions import Fraction
+            max_base_chance = Fraction(max_count, count)
+            encounter_chance = Fraction(weight, total_weight)
+        else:
+            max_base_chance = max_count / count
+            encounter_chance = weight / total_weight
+        per_dict[stat] = {
+            "base_chance": max_base_chance,
+            "encounter_chance": encounter_chance,
+            "max": max_base_chance > 0
+        }
+    return per_dict
+
+class PetDistribution(Mapping):
+    """
+    Compact result of one pet calculation.
+
+    Holds one row per derived stat in flat typed arrays instead of nested
+    dicts: the (hp, att, def, agi) values, how many (mod, dist) pairs give
+    that stat, how many of those use the (2,2,2,2) modifier, and the
+    encounter weight out of total_weight.
+
+    It reads like the dict returned by calculate_chances, so
+    formatted_distribution and get_min_hp accept it as is. Per stat dicts are
+    only built when asked for.
+    """
+
+    __slots__ = ("stats", "counts", "max_counts", "weights", "total_weight", "_index")
+
+    _HEADER = struct.Struct("<4sIQ")
+    # Bumped whenever the layout changes, it is part of get_calculator_version
+    _MAGIC = b"PDS2"
+
+    def __init__(self, stats, counts, max_counts, weights, total_weight):
+        self.stats = stats            # 'q', 4 values per row
+        self.counts = counts          # 'I'
+        self.max_counts = max_counts  # 'I'
+        self.weights = weights        # 'Q'
+        self.total_weight = total_weight
+        self._index = None
+
+    @classmethod
+    def from_totals(cls, totals, total_weight):
+        stats, counts, max_counts, weights = array("q"), array("I"), array("I"), array("Q")
+        for stat, (count, weight, max_count) in totals.items():
+            try:
+                stats.extend(stat)
+            except OverflowError:
+                raise ValueError(f"derived stat {stat} does not fit in 64 bits") from None
+            counts.append(count)
+            max_counts.append(max_count)
+            weights.append(weight)
+        return cls(stats, counts, max_counts, weights, total_weight)
+
+    @classmethod
+    def from_distribution_dict(cls, stat_to_base, total=None, buckets=None, modifiers=None):
+        tables = _ruleset_tables(stat_to_base, total, buckets, modifiers)
+        totals = {}
+        for stat in stat_to_base:
+            count = sum(len(dists) for dists in stat_to_base[stat].values())
+            max_count = len(stat_to_base[stat].get(tables.max_mod, ()))
+            totals[stat] = (count, compute_encounter_weight(stat_to_base, stat, tables.weights), max_count)
+        return cls.from_totals(totals, len(tables.mods) * tables.total_weight)
+
+    def to_bytes(self):
+        # Header, then arrays widest first so from_buffer casts stay aligned
+        return b"".join((
+            self._HEADER.pack(self._MAGIC, len(self), self.total_weight),
+            memoryview(self.weights).tobytes(),
+            memoryview(self.stats).tobytes(),
+            memoryview(self.counts).tobytes(),
+            memoryview(self.max_counts).tobytes(),
+        ))
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        """Wrap bytes written by to_bytes without copying them."""
+        view = memoryview(buffer).cast("B")
+        magic, n, total_weight = cls._HEADER.unpack_from(view)
+        if magic != cls._MAGIC:
+            raise ValueError("not a PetDistribution buffer")
+        pos = cls._HEADER.size
+        columns = []
+        for typecode, width in (("Q", 1), ("q", 4), ("I", 1), ("I", 1)):
+            size = n * width * array(typecode).itemsize
+            columns.append(view[pos:pos + size].cast(typecode))
+            pos += size
+        weights, stats, counts, max_counts = columns
+        return cls(stats, counts, max_counts, weights, total_weight)
+
+    @property
+    def nbytes(self):
+        return self._HEADER.size + sum(
+            len(column) * column.itemsize
+            for column in (self.weights, self.stats, self.counts, self.max_counts)
+        )
+
+    def stat(self, i):
+        return tuple(self.stats[i * 4:i * 4 + 4])
+
+    def base_chance(self, i, exact=False):
+        if exact:
+            from fractions import Fraction
+            return Fraction(self.max_counts[i], self.counts[i])
+        return self.max_counts[i] / self.counts[i]
+
+    def encounter_chance(self, i, exact=False):
+        if exact:
+            from fractions import Fraction
+            return Fraction(self.weights[i], self.total_weight)
+        return self.weights[i] / self.total_weight
+
+    def is_max(self, i):
+        return self.max_counts[i] > 0
+
+    def chances(self, i, exact=False):
+        base_chance = self.base_chance(i, exact)
+        return {
+            "base_chance": base_chance,
+            "encounter_chance": self.encounter_chance(i, exact),
+            "max": base_chance > 0
+        }
+
+    def index(self, stat):
+        if self._index is None:
+            self._index = {self.stat(i): i for i in range(len(self))}
+        return self._index[tuple(stat)]
+
+    def min_hp(self, max_only=True):
+        return min(self.stats[i * 4] for i in range(len(self)) if self.is_max(i) is max_only)
+
+    def to_chance_dict(self, exact=False):
+        return {self.stat(i): self.chances(i, exact) for i in range(len(self))}
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __iter__(self):
+        return (self.stat(i) for i in range(len(self)))
+
+    def __getitem__(self, stat):
+        try:
+            i = self.index(stat)
+        except KeyError:
+            raise KeyError(stat) from None
+        return self.chances(i)
+
+    def items(self):
+        return ((self.stat(i), self.chances(i)) for i in range(len(self)))
+
+def _hash_code(h, code):
+    # Nested code objects (comprehensions) repr with their address, so walk them
+    h.update(code.co_code)
+    for const in code.co_consts:
+        if hasattr(const, "co_code"):
+            _hash_code(h, const)
+        else:
+            h.update(repr(const).encode())
+
+def get_calculator_version():
+    """
+    Short hash of everything a stored result depends on: the compute_derived
+    code, the A/B tables and the PetDistribution layout. Anything persisted
+    should be keyed with it so stale results are never read back.
+    """
+    import hashlib
+    tables = get_tables()
+    h = hashlib.sha1()
+    _hash_code(h, compute_derived.__code__)
+    h.update(repr(tables.dists).encode())
+    h.update(repr(tables.mods).encode())
+    h.update(PetDistribution._MAGIC)
+    return h.hexdigest()[:16]
+
+def get_pet_distribution(
+    i_base, i_hp, i_at, i_df, i_sp,
+    total=10, buckets=4, modifiers=DEFAULT_MODIFIERS, coefficients=DERIVED_COEFFICIENTS,
+):
+    tables = get_tables(total, buckets, modifiers)
+    totals = _profiled_sum_offsets(i_base, i_hp, i_at, i_df, i_sp, tables, coefficients)
+    with profiling.span("pack distribution"):
+        return PetDistribution.from_totals(totals, len(tables.mods) * tables.total_weight)
+
+_offset_tree = None
+
+def get_offset_tree():
+    """
+    get_offset_table nested by agi, att and def offset, sorted by hp offset:
+
+        [(o_sp, [(o_at, o_hp range, o_df range, [(o_df, o_hps, [(o_hp, position, count, weight, max_count)])])])]
+
+    position is the entry's index in get_offset_table. The ranges let a
+    query bound each derived stat of an att group from its two corners,
+    since every derived stat only grows when a base stat grows.
+    """
+    global _offset_tree
+    if _offset_tree is None:
+        nested = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+        for position, ((o_hp, o_at, o_df, o_sp), count, weight, max_count, _) in enumerate(get_offset_table()):
+            nested[o_sp][o_at][o_df].append((o_hp, position, count, weight, max_count))
+        tree = []
+        for o_sp, by_at in sorted(nested.items()):
+            at_groups = []
+            for o_at, by_df in sorted(by_at.items()):
+                df_groups = []
+                for o_df, leaves in sorted(by_df.items()):
+                    leaves.sort()
+                    df_groups.append((o_df, [leaf[0] for leaf in leaves], leaves))
+                at_groups.append((
+                    o_at,
+                    (min(g[1][0] for g in df_groups), max(g[1][-1] for g in df_groups)),
+                    (df_groups[0][0], df_groups[-1][0]),
+                    df_groups,
+                ))
+            tree.append((o_sp, at_groups))
+        _offset_tree = tree
+    return _offset_tree
+
+def _within(stats, low, high):
+    # Stats that lie between the derived stats of a group's two corners
+    return [
+        stat for stat in stats
+        if low[0] <= stat[0] <= high[0] and low[1] <= stat[1] <= high[1] and low[2] <= stat[2] <= high[2]
+    ]
+
+def get_max_base_stats(i_base, i_hp, i_at, i_df, i_sp):
+    """Derived stats the (2,2,2,2) modifier can reach, from the 286 dists alone"""
+    return {
+        compute_derived((i_hp + d_hp + 2, i_at + d_at + 2, i_df + d_df + 2, i_sp + d_sp + 2), i_base)
+        for d_hp, d_at, d_df, d_sp in get_tables().dists
+    }
+
+def get_max_base_min_hp(i_base, i_hp, i_at, i_df, i_sp):
+    """get_min_hp(..., max_only=True) without computing the distribution"""
+    return min(stat[0] for stat in get_max_base_stats(i_base, i_hp, i_at, i_df, i_sp))
+
+def get_max_base_distribution(i_base, i_hp, i_at, i_df, i_sp):
+    """
+    get_pet_distribution restricted to the stats the (2,2,2,2) modifier can
+    reach, which is all formatted_distribution shows with max_only=True.
+
+    Those targets come from the 286 max base dists. Competing modifiers are
+    then counted by walking get_offset_tree, skipping agi and att groups that
+    cannot hit a target and only evaluating hp offsets near the targets' hp.
+    """
+    if i_base <= 0:
+        # Derived stats stop being increasing in the base stats, so the bounds do not hold
+        full = get_pet_distribution(i_base, i_hp, i_at, i_df, i_sp)
+        totals = {
+            full.stat(i): (full.counts[i], full.weights[i], full.max_counts[i])
+            for i in range(len(full)) if full.is_max(i)
+        }
+        return PetDistribution.from_totals(totals, full.total_weight)
+
+    targets = get_max_base_stats(i_base, i_hp, i_at, i_df, i_sp)
+    by_agi = defaultdict(list)
+    for stat in targets:
+        by_agi[stat[3]].append(stat)
+
+    found = {}
+    for o_sp, at_groups in get_offset_tree():
+        sp = i_sp + o_sp
+        agi = compute_derived((0, 0, 0, sp), i_base)[3]
+        if agi not in by_agi:
+            continue
+        for o_at, (hp_low, hp_high), (df_low, df_high), df_groups in at_groups:
+            at = i_at + o_at
+            low = compute_derived((i_hp + hp_low, at, i_df + df_low, sp), i_base)
+            high = compute_derived((i_hp + hp_high, at, i_df + df_high, sp), i_base)
+            at_candidates = _within(by_agi[agi], low, high)
+            if not at_candidates:
+                continue
+
+            # hp is the only stat that moves much with the hp offset (x4), so rather than
+            # bounding every def group, solve for the hp offsets that can land in the
+            # candidates' hp range (one step of slack for rounding) and bisect to them.
+            hp_min = min(stat[0] for stat in at_candidates)
+            if hp_min <= 0:
+                # int() truncates toward zero, so hp <= 0 also comes from values down to hp - 1
+                hp_min -= 1
+            hp_max = max(stat[0] for stat in at_candidates)
+            for o_df, hp_offsets, leaves in df_groups:
+                rest = at + i_df + o_df + sp
+                first = bisect_left(hp_offsets, math.floor((hp_min * 100 / i_base - rest) / 4) - i_hp - 1)
+                last = bisect_right(hp_offsets, math.ceil(((hp_max + 1) * 100 / i_base - rest) / 4) - i_hp + 1)
+                for o_hp, position, count, weight, max_count in leaves[first:last]:
+                    derived = compute_derived((i_hp + o_hp, at, i_df + o_df, sp), i_base)
+                    if derived not in targets:
+                        continue
+                    entry = found.get(derived)
+                    if entry is None:
+                        found[derived] = [position, count, weight, max_count]
+                    else:
+                        entry[0] = min(entry[0], position)
+                        entry[1] += count
+                        entry[2] += weight
+                        entry[3] += max_count
+
+    # Same row order as the full calculation, so sort ties come out the same
+    totals = {
+        stat: (count, weight, max_count)
+        for stat, (_, count, weight, max_count) in sorted(found.items(), key=lambda item: item[1][0])
+    }
+    tables = get_tables()
+    return PetDistribution.from_totals(totals, len(tables.mods) * tables.total_weight)
+
+def compute_max_base_chance(stat_to_base, stat, exact=False, max_mod=None):
+    if isinstance(stat_to_base, PetDistribution):
+        return stat_to_base.base_chance(stat_to_base.index(stat), exact)
+    if max_mod is None:
+        max_mod = _ruleset_tables(stat_to_base).max_mod
+    if max_mod not in stat_to_base[stat].keys():
         return 0
     all_base_count = sum([len(stat_to_base[stat][base]) for base in stat_to_base[stat].keys()])
     if all_base_count == 0:
         return 1
-    max_base_count = len(stat_to_base[stat][(2,2,2,2)])
+    max_base_count = len(stat_to_base[stat][max_mod])
+    if exact:
+        from fractions import Fraction
+        return Fraction(max_base_count, all_base_count)
     return (max_base_count / all_base_count)
 
-def compute_encounter_chance(stat_to_base, stat):
-    prob = 0
+def compute_encounter_weight(stat_to_base, stat, weights=None):
+    # Integer weight out of len(B) * DIST_TOTAL_WEIGHT
+    if weights is None:
+        weights = _ruleset_tables(stat_to_base).weights
+    weight = 0
     for base in stat_to_base[stat]:
         for dist in stat_to_base[stat][base]:
-            prob += compute_dist_prob(dist)
-    return (prob / 625)
-
-
-def calculate_chances(stat_to_base):
+            weight += weights[dist]
+    return weight
+
+def compute_encounter_chance(stat_to_base, stat, exact=False, tables=None):
+    if tables is None:
+        tables = _ruleset_tables(stat_to_base)
+    weight = compute_encounter_weight(stat_to_base, stat, tables.weights)
+    if exact:
+        from fractions import Fraction
+        return Fraction(weight, len(tables.mods) * tables.total_weight)
+    return weight / (len(tables.mods) * tables.total_weight)
+
+
+def calculate_chances(stat_to_base, exact=False, total=None, buckets=None, modifiers=None):
+    """
+    Chance table of a get_distribution_dict result, for the ruleset it was
+    built with unless total, buckets or modifiers say otherwise.
+    """
+    tables = _ruleset_tables(stat_to_base, total, buckets, modifiers)
     per_dict = defaultdict(lambda: defaultdict(float))
-    for stat in stat_to_base.keys():
-        max_base_chance = compute_max_base_chance(stat_to_base, stat)
-        per_dict[stat] = {
-            "base_chance": max_base_chance,
-            "encounter_chance": compute_encounter_chance(stat_to_base, stat),
-            "max": max_base_chance > 0
-        }
+    with profiling.span("chances"):
+        for stat in stat_to_base.keys():
+            max_base_chance = compute_max_base_chance(stat_to_base, stat, exact, tables.max_mod)
+            per_dict[stat] = {
+                "base_chance": max_base_chance,
+                "encounter_chance": compute_encounter_chance(stat_to_base, stat, exact, tables),
+                "max": max_base_chance > 0
+            }
     return per_dict
 
 def represent_s_pet(i_base, i_hp, i_at, i_df, i_sp):
@@ -143,27 +761,80 @@ def one_in_x_korean(p: float) -> str:
     return format_korean_number(x)
 
 
+def format_entry(stat, per_d, max_only=True):
+    # The full listing has always been written without the space before the dash
+    separator = " - " if max_only else "- "
+    entry_str = f"{stat[1]}{stat[2]}{stat[3]}{stat[0]}{separator}{stat[1]} {stat[2]} {stat[3]} {stat[0]}:\n"
+    entry_str += f"    맥스 베이스일 확률: {round_to_significant(per_d['base_chance'] * 100)}%"
+    entry_str += f" ({one_in_x_korean(per_d['base_chance'])} 중 1)\n" if 0 < per_d['base_chance'] < 0.01 else "\n"
+    entry_str += f"    페트 등장/출현 확률: {round_to_significant(per_d['encounter_chance'] * 100)}%"
+    entry_str += f" ({one_in_x_korean(per_d['encounter_chance'])} 중 1)\n" if 0 < per_d['encounter_chance'] < 0.01 else "\n"
+    return entry_str
+
+def parse_stat(text):
+    """(hp, att, df, agi) of a level 1 stat typed as 공 방 순 체, the order format_entry shows it in"""
+    parts = text.replace(",", " ").split()
+    if len(parts) != 4:
+        raise ValueError(text)
+    att, df, agi, hp = map(int, parts)
+    return hp, att, df, agi
+
+def is_shown(per_d, max_only=True):
+    return max_only is False or per_d["max"] is max_only
+
+def _shown_rows(per_dict, max_only, sort_key, limit):
+    # (stat, per_d) in display order, at most limit of them
+    if isinstance(per_dict, PetDistribution):
+        # Sort row numbers on the arrays, per stat dicts are only built for what is yielded
+        chance = per_dict.base_chance if sort_key == "base_chance" else per_dict.encounter_chance
+        rows = (i for i in range(len(per_dict)) if max_only is False or per_dict.is_max(i) is max_only)
+        if limit is None:
+            rows = sorted(rows, key=chance, reverse=True)
+        else:
+            rows = heapq.nlargest(limit, rows, key=chance)
+        return ((per_dict.stat(i), per_dict.chances(i)) for i in rows)
+
+    items = (item for item in per_dict.items() if is_shown(item[1], max_only))
+    if limit is None:
+        return iter(sorted(items, key=lambda x: x[1][sort_key], reverse=True))
+    return iter(heapq.nlargest(limit, items, key=lambda x: x[1][sort_key]))
+
+def iter_formatted_distribution(per_dict, max_only=True, sort_key="base_chance", limit=None, min_chance=None):
+    """
+    Yield the entries of formatted_distribution one at a time, in the same
+    order and text. limit keeps only the first entries, min_chance stops at
+    the first entry whose sort_key chance is below it.
+    """
+    for stat, per_d in _shown_rows(per_dict, max_only, sort_key, limit):
+        if min_chance is not None and per_d[sort_key] < min_chance:
+            return
+        yield format_entry(stat, per_d, max_only)
+
+def write_distribution(out, per_dict, max_only=True, sort_key="base_chance", limit=None, min_chance=None):
+    """
+    Stream a report into anything with write(), e.g. an open file or
+    socket.makefile("w", encoding="utf-8"). Returns the number of entries.
+    """
+    count = 0
+    with profiling.span("format"):
+        for entry in iter_formatted_distribution(per_dict, max_only, sort_key, limit, min_chance):
+            out.write(entry)
+            count += 1
+    profiling.count("rows formatted", count)
+    return count
+
 def formatted_distribution(per_dict, max_only=True, sort_key="base_chance"):
-    return_str = ""
-    for stat, per_d in sorted(per_dict.items(), key=lambda x: x[1][sort_key], reverse=True):
-        if max_only is False:
-            return_str += f"{stat[1]}{stat[2]}{stat[3]}{stat[0]}- {stat[1]} {stat[2]} {stat[3]} {stat[0]}:\n"
-            return_str += f"    맥스 베이스일 확률: {round_to_significant(per_d['base_chance'] * 100)}%"
-            return_str += f" ({one_in_x_korean(per_d['base_chance'])} 중 1)\n" if 0 < per_d['base_chance'] < 0.01 else "\n"
-            return_str += f"    페트 등장/출현 확률: {round_to_significant(per_d['encounter_chance'] * 100)}%"
-            return_str += f" ({one_in_x_korean(per_d['encounter_chance'])} 중 1)\n" if 0 < per_d['encounter_chance'] < 0.01 else "\n"
-        elif per_d["max"] is max_only:
-            return_str += f"{stat[1]}{stat[2]}{stat[3]}{stat[0]} - {stat[1]} {stat[2]} {stat[3]} {stat[0]}:\n"
-            return_str += f"    맥스 베이스일 확률: {round_to_significant(per_d['base_chance'] * 100)}%"
-            return_str += f" ({one_in_x_korean(per_d['base_chance'])} 중 1)\n" if 0 < per_d['base_chance'] < 0.01 else "\n"
-            return_str += f"    페트 등장/출현 확률: {round_to_significant(per_d['encounter_chance'] * 100)}%"
-            return_str += f" ({one_in_x_korean(per_d['encounter_chance'])} 중 1)\n" if 0 < per_d['encounter_chance'] < 0.01 else "\n"
-    return return_str
-
-def pet_calculate(distribution_dict):
+    with profiling.span("format"):
+        entries = list(iter_formatted_distribution(per_dict, max_only, sort_key))
+    profiling.count("rows formatted", len(entries))
+    return "".join(entries)
+
+def pet_calculate(distribution_dict, exact=False, total=None, buckets=None, modifiers=None):
     # distribution_dict = get_distribution_dict(i_base, i_hp, i_at, i_df, i_sp)
-    chance_dict = calculate_chances(distribution_dict)
+    chance_dict = calculate_chances(distribution_dict, exact, total, buckets, modifiers)
     return chance_dict
 
 def get_min_hp(distribution_dict, max_only=True):
+    if isinstance(distribution_dict, PetDistribution):
+        return distribution_dict.min_hp(max_only)
     return min(key[0] for key, value in distribution_dict.items() if value.get("max", False) is max_only)
@@ -0,0 +1,148 @@
+'''
+Precomputed results for every pet in pet_data.txt.
+
+`python pet_catalog.py` runs get_pet_distribution for every row across a
+process pool and writes a single binary file:
+
+    header   magic, row count, sha1 of pet_data.txt, calculator version
+    index    one fixed size entry per pet (record offset/size, name, preset values)
+    names    utf-8 names referenced by the index
+    records  PetDistribution.to_bytes() of each pet, 8 byte aligned
+
+PetCatalog memory-maps that file and hands out PetDistribution objects that
+read straight from the mapping, so nothing is computed at startup. The file
+is only rebuilt when pet_data.txt or get_calculator_version() changes.
+'''
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+
+from pet_calculator import PetDistribution, get_pet_distribution, get_calculator_version
+from presets import PET_DATA_PATH, load_pet_presets
+
+CATALOG_PATH = "pet_catalog.bin"
+
+_MAGIC = b"PCAT"
+_HEADER = struct.Struct("<4sI20s16s")
+# record offset, record size, name offset, name size, i_base, hp, at, df, sp
+_ENTRY = struct.Struct("<QIIH5h")
+
+def source_hash(path=PET_DATA_PATH):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).digest()
+
+def _compute_record(values):
+    return get_pet_distribution(*values).to_bytes()
+
+def build_catalog(path=PET_DATA_PATH, out=CATALOG_PATH, workers=None):
+    from concurrent.futures import ProcessPoolExecutor
+    presets = load_pet_presets(path)
+    names = list(presets)
+    rows = [presets[name] for name in names]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        records = list(executor.map(_compute_record, rows, chunksize=8))
+
+    encoded_names = [name.encode("utf-8") for name in names]
+    names_offset = _HEADER.size + _ENTRY.size * len(names)
+    names_size = sum(len(name) for name in encoded_names)
+    record_offset = names_offset + names_size
+    record_offset += -record_offset % 8
+
+    index = []
+    name_offset = names_offset
+    for name, values, record in zip(encoded_names, rows, records):
+        index.append(_ENTRY.pack(record_offset, len(record), name_offset, len(name), *values))
+        name_offset += len(name)
+        record_offset += len(record) + (-len(record) % 8)
+
+    tmp = out + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, len(names), source_hash(path), get_calculator_version().encode()))
+        f.writelines(index)
+        f.writelines(encoded_names)
+        f.write(b"\0" * (-f.tell() % 8))
+        for record in records:
+            f.write(record)
+            f.write(b"\0" * (-len(record) % 8))
+    os.replace(tmp, out)
+    return out
+
+def is_current(out=CATALOG_PATH, path=PET_DATA_PATH):
+    try:
+        with open(out, "rb") as f:
+            magic, _, digest, version = _HEADER.unpack(f.read(_HEADER.size))
+    except (OSError, struct.error):
+        return False
+    return (
+        magic == _MAGIC
+        and digest == source_hash(path)
+        and version == get_calculator_version().encode()
+    )
+
+def ensure_catalog(path=PET_DATA_PATH, out=CATALOG_PATH, workers=None):
+    """Rebuild the catalog only if it is missing or out of date"""
+    if not is_current(out, path):
+        build_catalog(path, out, workers)
+    return out
+
+class PetCatalog:
+    def __init__(self, out=CATALOG_PATH):
+        with open(out, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, self.source_hash, version = _HEADER.unpack_from(self._map)
+        if magic != _MAGIC:
+            raise ValueError(f"{out} is not a pet catalog")
+        self.version = version.decode()
+
+        self._records = {}
+        self._by_values = {}
+        for i in range(count):
+            record_offset, record_size, name_offset, name_size, *values = _ENTRY.unpack_from(
+                self._map, _HEADER.size + i * _ENTRY.size
+            )
+            name = self._map[name_offset:name_offset + name_size].decode("utf-8")
+            self._records[name] = (record_offset, record_size, tuple(values))
+            self._by_values.setdefault(tuple(values), name)
+
+    @classmethod
+    def open_current(cls, out=CATALOG_PATH, path=PET_DATA_PATH):
+        """Open the catalog if it matches pet_data.txt and this calculator, else None"""
+        if not is_current(out, path):
+            return None
+        return cls(out)
+
+    def names(self):
+        return list(self._records)
+
+    def values(self, name):
+        return list(self._records[name][2])
+
+    def get(self, name):
+        record_offset, record_size, _ = self._records[name]
+        return PetDistribution.from_buffer(memoryview(self._map)[record_offset:record_offset + record_size])
+
+    def find(self, i_base, i_hp, i_at, i_df, i_sp):
+        """Result for these exact preset values, or None if no pet in the catalog has them"""
+        name = self._by_values.get((i_base, i_hp, i_at, i_df, i_sp))
+        if name is None:
+            return None
+        return self.get(name)
+
+    def __contains__(self, name):
+        return name in self._records
+
+    def __len__(self):
+        return len(self._records)
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else PET_DATA_PATH
+    out = sys.argv[2] if len(sys.argv) > 2 else CATALOG_PATH
+    if is_current(out, path):
+        print(f"{out} is up to date")
+    else:
+        build_catalog(path, out)
+        print(f"wrote {out}")
@@ -0,0 +1,93 @@
+'''
+Bulk verdicts for captured level 1 pets of one species.
+
+build_lookup turns the calculate_chances result of a pet into a dict keyed by
+(HP, Att, Def, Agi) with the output line for that stat already formatted, so
+classifying an observation is a parse and a dict lookup. Observations are
+read and written one line at a time, so memory does not grow with the input.
+
+    python pet_classifier.py --pet 두리 captures.txt
+    python pet_classifier.py 20 22 23 11 23 < captures.txt
+
+Each input line is "Att Def Agi HP" (공 방 순 체 as the result list shows it,
+spaces or commas). Each output line is the stat in the same order followed
+by max base chance and encounter chance, or 불가능 when the species cannot
+roll that stat.
+'''
+
+import argparse
+import sys
+
+from pet_calculator import get_pet_distribution, parse_stat
+from presets import PET_DATA_PATH, load_pet_presets
+
+IMPOSSIBLE = "불가능"
+INVALID = "잘못된 입력"
+
+def build_lookup(chances):
+    """(hp, att, df, agi) -> (base_chance, encounter_chance) for a calculate_chances result"""
+    return {stat: (per_d["base_chance"], per_d["encounter_chance"]) for stat, per_d in chances.items()}
+
+def parse_observation(line):
+    return parse_stat(line)
+
+def classify(observations, lookup):
+    """Yield (stat, (base_chance, encounter_chance) or None) for each observed stat"""
+    get = lookup.get
+    for stat in observations:
+        yield stat, get(stat)
+
+def classify_lines(lines, lookup):
+    """Yield one verdict line per non-empty input line"""
+    # Verdict text only depends on the stat, so format each one once
+    verdicts = {
+        stat: f"{base_chance:.6g}\t{encounter_chance:.6g}"
+        for stat, (base_chance, encounter_chance) in lookup.items()
+    }
+    get = verdicts.get
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            stat = parse_observation(line)
+        except ValueError:
+            yield f"{line}\t{INVALID}\n"
+            continue
+        yield f"{stat[1]} {stat[2]} {stat[3]} {stat[0]}\t{get(stat, IMPOSSIBLE)}\n"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classify observed level 1 pet stats")
+    parser.add_argument("args", nargs="*", help="초기계수 HP Att Def Agi [FILE], or just [FILE] with --pet")
+    parser.add_argument("--pet", help="preset name from pet_data.txt instead of values")
+    parser.add_argument("--presets", default=PET_DATA_PATH)
+    args = parser.parse_args(argv)
+
+    positional = args.args
+    if args.pet is not None:
+        presets = load_pet_presets(args.presets)
+        if args.pet not in presets:
+            parser.error(f"unknown pet {args.pet!r}, valid names: {', '.join(presets)}")
+        values = presets[args.pet]
+    else:
+        try:
+            values = list(map(int, positional[:5]))
+        except ValueError:
+            values = []
+        if len(values) != 5:
+            parser.error("give --pet NAME or 5 values: 초기계수 HP Att Def Agi")
+        positional = positional[5:]
+    if len(positional) > 1:
+        parser.error("at most one input file")
+    source = positional[0] if positional else None
+
+    lookup = build_lookup(get_pet_distribution(*values))
+    stream = open(source, encoding="utf-8") if source else sys.stdin
+    try:
+        sys.stdout.writelines(classify_lines(stream, lookup))
+    finally:
+        if source:
+            stream.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+'''
+Reverse lookup: which species could have rolled these level 1 stats.
+
+SpeciesIndex inverts the pet catalog into derived stat -> every species that
+can reach it, with that species' encounter and max base chance. Candidates
+for a stat are stored already ranked by encounter chance, so a lookup is one
+dict access plus the slice of candidates.
+
+The index is built from the memory-mapped catalog (nothing is recomputed)
+and saved to its own compact file next to it, tagged with the catalog's
+pet_data.txt hash and calculator version.
+'''
+
+import struct
+import sys
+from array import array
+from collections import defaultdict, namedtuple
+
+from pet_calculator import parse_stat
+from pet_catalog import CATALOG_PATH, PetCatalog, ensure_catalog
+from presets import PET_DATA_PATH
+
+INDEX_PATH = "pet_species_index.bin"
+
+SpeciesCandidate = namedtuple("SpeciesCandidate", ["name", "encounter_chance", "base_chance"])
+
+_MAGIC = b"PIDX"
+# species count, stat count, candidate count, total weight, pet_data.txt sha1, calculator version
+_HEADER = struct.Struct("<4sIIIQ20s16s")
+
+class SpeciesIndex:
+    __slots__ = (
+        "names", "source_hash", "version", "total_weight",
+        "stats", "starts", "weights", "species", "max_counts", "counts", "_lookup",
+    )
+
+    def __init__(self, names, source_hash, version, total_weight,
+                 stats, starts, weights, species, max_counts, counts):
+        self.names = names
+        self.source_hash = source_hash
+        self.version = version
+        self.total_weight = total_weight
+        self.stats = stats            # 'i', 4 values per distinct stat
+        self.starts = starts          # 'I', candidates of stat i are starts[i]:starts[i + 1]
+        self.weights = weights        # 'Q', encounter weight of each candidate
+        self.species = species        # 'H', index into names
+        self.max_counts = max_counts  # 'I'
+        self.counts = counts          # 'I'
+        self._lookup = {tuple(stats[i * 4:i * 4 + 4]): i for i in range(len(starts) - 1)}
+
+    @classmethod
+    def build(cls, catalog):
+        names = catalog.names()
+        by_stat = defaultdict(list)
+        total_weight = 0
+        for s_idx, name in enumerate(names):
+            dist = catalog.get(name)
+            total_weight = dist.total_weight
+            for i in range(len(dist)):
+                by_stat[dist.stat(i)].append((dist.weights[i], s_idx, dist.max_counts[i], dist.counts[i]))
+
+        stats, starts = array("i"), array("I", [0])
+        weights, species, max_counts, counts = array("Q"), array("H"), array("I"), array("I")
+        for stat in sorted(by_stat):
+            stats.extend(stat)
+            for weight, s_idx, max_count, count in sorted(by_stat[stat], key=lambda c: (-c[0], c[1])):
+                weights.append(weight)
+                species.append(s_idx)
+                max_counts.append(max_count)
+                counts.append(count)
+            starts.append(len(weights))
+        return cls(names, catalog.source_hash, catalog.version, total_weight,
+                   stats, starts, weights, species, max_counts, counts)
+
+    def save(self, path=INDEX_PATH):
+        encoded = [name.encode("utf-8") for name in self.names]
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(
+                _MAGIC, len(self.names), len(self.starts) - 1, len(self.weights),
+                self.total_weight, self.source_hash, self.version.encode(),
+            ))
+            f.write(array("H", map(len, encoded)).tobytes())
+            f.writelines(encoded)
+            for column in (self.stats, self.starts, self.weights, self.species, self.max_counts, self.counts):
+                f.write(column.tobytes())
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, n_species, n_stats, n_candidates, total_weight, source_hash, version = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a species index")
+        pos = _HEADER.size
+
+        def read(typecode, n):
+            nonlocal pos
+            column = array(typecode)
+            column.frombytes(data[pos:pos + n * column.itemsize])
+            pos += n * column.itemsize
+            return column
+
+        names = []
+        for size in read("H", n_species):
+            names.append(data[pos:pos + size].decode("utf-8"))
+            pos += size
+        stats = read("i", n_stats * 4)
+        starts = read("I", n_stats + 1)
+        weights = read("Q", n_candidates)
+        species = read("H", n_candidates)
+        max_counts = read("I", n_candidates)
+        counts = read("I", n_candidates)
+        return cls(names, source_hash, version.decode(), total_weight,
+                   stats, starts, weights, species, max_counts, counts)
+
+    def lookup(self, hp, att, df, agi, limit=None):
+        """Species that can roll (hp, att, df, agi) at level 1, most likely first"""
+        i = self._lookup.get((hp, att, df, agi))
+        if i is None:
+            return []
+        start, end = self.starts[i], self.starts[i + 1]
+        if limit is not None:
+            end = min(end, start + limit)
+        return [
+            SpeciesCandidate(
+                self.names[self.species[j]],
+                self.weights[j] / self.total_weight,
+                self.max_counts[j] / self.counts[j],
+            )
+            for j in range(start, end)
+        ]
+
+    def __len__(self):
+        return len(self.starts) - 1
+
+def open_index(path=INDEX_PATH, catalog_path=CATALOG_PATH, data_path=PET_DATA_PATH):
+    """Load the saved index, rebuilding the catalog and/or index first if either is stale"""
+    ensure_catalog(data_path, catalog_path)
+    catalog = PetCatalog(catalog_path)
+    try:
+        index = SpeciesIndex.load(path)
+        if index.source_hash == catalog.source_hash and index.version == catalog.version:
+            return index
+    except (OSError, ValueError, struct.error):
+        pass
+    index = SpeciesIndex.build(catalog)
+    index.save(path)
+    return index
+
+if __name__ == "__main__":
+    # python pet_lookup.py Att Def Agi HP (공 방 순 체, as the result list shows it)
+    index = open_index()
+    hp, att, df, agi = parse_stat(" ".join(sys.argv[1:5]))
+    for candidate in index.lookup(hp, att, df, agi):
+        print(f"{candidate.name}\t{candidate.encounter_chance:.6g}\t{candidate.base_chance:.6g}")
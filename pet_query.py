@@ -0,0 +1,205 @@
+'''
+Probability queries over one pet's level 1 outcomes.
+
+StatIndex answers, from a calculate_chances table or a PetDistribution:
+
+    index.probability(att=(25, None))          P(공격 >= 25)
+    index.probability(hp=(60, 70), agi=30)      P(60 <= 체력 <= 70 and 순발 == 30)
+    index.percentile((64, 25, 20, 31))          where this stat falls, per stat and by rarity
+    index.top_k(5, max_only=True)               the 5 most likely outcomes
+
+Each stat keeps its distinct values sorted with a running sum of encounter
+weight, so a condition on one stat is two bisects. Outcomes are also kept
+sorted by encounter weight with a running sum, which gives the rarity
+percentile with one bisect and the top k as a slice. Conditions on several
+stats scan only the rows inside the narrowest single stat range.
+
+For catalog pets get_stat_index(name) reads the result from the catalog.
+parse_conditions reads the short form the pet tab accepts, e.g. "공>=25 순 20-30".
+'''
+
+import re
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from functools import lru_cache
+from itertools import accumulate
+
+from pet_calculator import PetDistribution, get_pet_distribution
+from pet_catalog import PetCatalog
+from presets import load_pet_presets
+
+STAT_FIELDS = ("hp", "att", "df", "agi")
+# Short and long names as the pet tab labels them
+STAT_LABELS = {"체력": 0, "체": 0, "공격": 1, "공": 1, "방어": 2, "방": 2, "순발": 3, "순": 3}
+
+# Share of outcomes below the stat on each stat (ties count half), and the
+# chance of rolling something more likely than the whole stat
+StatPercentile = namedtuple("StatPercentile", [*STAT_FIELDS, "rarity"])
+
+_CONDITION = re.compile(
+    r"(체력|체|공격|공|방어|방|순발|순)\s*(>=|<=|>|<|=)?\s*(-?\d+)(?:\s*[-~]\s*(-?\d+))?"
+)
+
+class StatIndex:
+    def __init__(self, chances):
+        """chances: calculate_chances style table or PetDistribution"""
+        if isinstance(chances, PetDistribution):
+            # Integer weights keep every sum exact
+            self.stats = list(chances)
+            weights = list(chances.weights)
+            self.total = chances.total_weight
+            self.is_max = [chances.is_max(i) for i in range(len(chances))]
+        else:
+            self.stats = list(chances)
+            weights = [chances[stat]["encounter_chance"] for stat in self.stats]
+            self.total = 1.0
+            self.is_max = [chances[stat]["max"] for stat in self.stats]
+        self.weights = weights
+        self._row = {stat: i for i, stat in enumerate(self.stats)}
+
+        # Per stat: distinct values ascending, weight up to each value, rows in value order
+        self._values = []
+        self._cumulative = []
+        self._rows_by_value = []
+        self._row_values = []
+        for k in range(4):
+            order = sorted(range(len(self.stats)), key=lambda i: self.stats[i][k])
+            values, sums = [], []
+            for i in order:
+                value = self.stats[i][k]
+                if values and values[-1] == value:
+                    sums[-1] += weights[i]
+                else:
+                    values.append(value)
+                    sums.append(weights[i])
+            self._values.append(values)
+            self._cumulative.append([0, *accumulate(sums)])
+            self._rows_by_value.append(order)
+            self._row_values.append([self.stats[i][k] for i in order])
+
+        # Most likely first, ties in table order like formatted_distribution
+        self._by_likelihood = sorted(range(len(self.stats)), key=lambda i: weights[i], reverse=True)
+        self._max_by_likelihood = [i for i in self._by_likelihood if self.is_max[i]]
+        # Ascending weights with running sums for the rarity percentile
+        ascending = self._by_likelihood[::-1]
+        self._ascending_weights = [weights[i] for i in ascending]
+        self._ascending_cumulative = [0, *accumulate(self._ascending_weights)]
+
+    def __len__(self):
+        return len(self.stats)
+
+    def _range_weight(self, k, low, high):
+        values = self._values[k]
+        start = 0 if low is None else bisect_left(values, low)
+        end = len(values) if high is None else bisect_right(values, high)
+        if start >= end:
+            return 0
+        cumulative = self._cumulative[k]
+        return cumulative[end] - cumulative[start]
+
+    def probability(self, hp=None, att=None, df=None, agi=None):
+        """
+        Encounter chance of a stat within every given condition. A condition
+        is a value, or an inclusive (low, high) range where None leaves that
+        side open.
+        """
+        conditions = [
+            (k, (c, c) if isinstance(c, int) else tuple(c))
+            for k, c in enumerate((hp, att, df, agi)) if c is not None
+        ]
+        if not conditions:
+            return self._ratio(self._cumulative[0][-1])
+        if len(conditions) == 1:
+            k, (low, high) = conditions[0]
+            return self._ratio(self._range_weight(k, low, high))
+
+        # Scan the rows of the narrowest range, check the rest on each row
+        def bounds(k, low, high):
+            row_values = self._row_values[k]
+            start = 0 if low is None else bisect_left(row_values, low)
+            end = len(row_values) if high is None else bisect_right(row_values, high)
+            return start, end
+
+        spans = [(bounds(k, low, high), k) for k, (low, high) in conditions]
+        (start, end), narrowest = min(spans, key=lambda span: span[0][1] - span[0][0])
+        others = [(k, low, high) for k, (low, high) in conditions if k != narrowest]
+        weight = 0
+        for i in self._rows_by_value[narrowest][start:end]:
+            stat = self.stats[i]
+            if all((low is None or stat[k] >= low) and (high is None or stat[k] <= high) for k, low, high in others):
+                weight += self.weights[i]
+        return self._ratio(weight)
+
+    def at_least(self, stat, value):
+        """P(stat >= value), stat is an index or one of STAT_FIELDS"""
+        return self._ratio(self._range_weight(self._stat_index(stat), value, None))
+
+    def at_most(self, stat, value):
+        return self._ratio(self._range_weight(self._stat_index(stat), None, value))
+
+    def percentile(self, stat):
+        """StatPercentile of an observed (hp, att, df, agi), 0 to 1, or None if the pet cannot roll it"""
+        stat = tuple(stat)
+        i = self._row.get(stat)
+        if i is None:
+            return None
+        shares = []
+        for k, value in enumerate(stat):
+            below = self._range_weight(k, None, value - 1)
+            equal = self._range_weight(k, value, value)
+            shares.append(self._ratio(below + equal / 2))
+        more_likely = self._ascending_cumulative[-1] - self._ascending_cumulative[
+            bisect_right(self._ascending_weights, self.weights[i])
+        ]
+        return StatPercentile(*shares, self._ratio(more_likely))
+
+    def top_k(self, k, max_only=False):
+        """[(stat, encounter chance)] of the k most likely outcomes"""
+        rows = self._max_by_likelihood if max_only else self._by_likelihood
+        return [(self.stats[i], self._ratio(self.weights[i])) for i in rows[:k]]
+
+    def _stat_index(self, stat):
+        return stat if isinstance(stat, int) else STAT_FIELDS.index(stat)
+
+    def _ratio(self, weight):
+        return weight / self.total
+
+def parse_conditions(text):
+    """
+    {field: value or (low, high)} from text like "공>=25 순 20-30 체<60",
+    raises ValueError if anything in it is not a condition.
+    """
+    conditions = {}
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = _CONDITION.match(text, pos)
+        if match is None:
+            raise ValueError(text)
+        label, op, value, high = match.groups()
+        value = int(value)
+        if high is not None:
+            if op:
+                raise ValueError(text)
+            condition = (value, int(high))
+        elif op in (None, "="):
+            condition = value
+        else:
+            condition = {
+                ">=": (value, None), ">": (value + 1, None), "<=": (None, value), "<": (None, value - 1),
+            }[op]
+        conditions[STAT_FIELDS[STAT_LABELS[label]]] = condition
+        pos = match.end()
+        while pos < len(text) and text[pos] in " ,":
+            pos += 1
+    if not conditions:
+        raise ValueError(text)
+    return conditions
+
+@lru_cache(maxsize=32)
+def get_stat_index(name):
+    """StatIndex of a pet in pet_data.txt, from the catalog when it is current"""
+    catalog = PetCatalog.open_current()
+    if catalog is not None and name in catalog:
+        return StatIndex(catalog.get(name))
+    return StatIndex(get_pet_distribution(*load_pet_presets()[name]))
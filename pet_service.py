@@ -0,0 +1,254 @@
+'''
+Local HTTP/JSON service for the pet and exp calculators.
+
+    python pet_service.py --port 8765 --workers 4
+
+    POST /pet   {"values": [초기계수, HP, Att, Def, Agi]} or {"name": "두리"}
+                optional "max_only" (true), "sort_key" ("base_chance"), "limit"
+    POST /exp   {"exp": 700000, "current_lvl": 100, "current_per": 0, "desired_lvl": 120}
+                optional calculate_exp_buff arguments (party_count, item_buff, ...)
+    GET  /stats cache, coalescing and request counters
+
+The pet math runs in a process pool. Identical pets requested while one is
+still being calculated wait for that calculation instead of starting their
+own, and finished pets are kept in a bounded LRU (presets come straight from
+the pet catalog when it is built). A max_only request for a pet that is not
+at hand only calculates the max base rows, with get_max_base_distribution. Exp answers are cheap and computed inline.
+load_test.py drives this service and reports latency percentiles.
+'''
+
+import argparse
+import asyncio
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+from exp_calculator import (
+    calculate_exp_buff, calculate_time_for_lvl, check_level_range, _format_time, _remaining_exp,
+)
+from pet_cache import LRUCache
+from pet_calculator import (
+    PetDistribution, format_entry, get_max_base_distribution, get_pet_distribution, represent_s_pet,
+)
+from pet_catalog import PetCatalog
+from pet_view import SORT_KEYS, ChanceView
+from presets import load_pet_presets
+
+DEFAULT_PORT = 8765
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+EXP_ARGUMENTS = ("transform_item", "event", "item_buff", "party_count", "newbie_item", "hero_echo")
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def _compute(values, max_only=False):
+    # Runs in the pool, bytes are much cheaper to send back than the object
+    if max_only:
+        return get_max_base_distribution(*values).to_bytes()
+    return get_pet_distribution(*values).to_bytes()
+
+class PetService:
+    def __init__(self, workers=None, cache_size=256, catalog=None, presets=None):
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.cache = LRUCache(cache_size)
+        self.catalog = catalog
+        self.presets = presets if presets is not None else {}
+        self._in_flight = {}
+        self.counters = {"requests": 0, "errors": 0, "cache_hits": 0, "catalog_hits": 0, "coalesced": 0, "computed": 0}
+
+    async def get_distribution(self, values, max_only=False):
+        """
+        Distribution of values. With max_only it may hold only the max base
+        rows, the full one is used when it is already cached.
+        """
+        key = tuple(values)
+        dist = self.cache.get(key)
+        if dist is None and max_only:
+            dist = self.cache.get((key, True))
+        if dist is not None:
+            self.counters["cache_hits"] += 1
+            return dist
+        if self.catalog is not None:
+            dist = self.catalog.find(*key)
+            if dist is not None:
+                self.counters["catalog_hits"] += 1
+                return dist
+
+        cache_key = (key, True) if max_only else key
+        task = self._in_flight.get(cache_key)
+        if task is None and max_only:
+            task = self._in_flight.get(key)
+        if task is not None:
+            self.counters["coalesced"] += 1
+        else:
+            task = self._in_flight[cache_key] = asyncio.ensure_future(self._compute(cache_key, key, max_only))
+        # Shielded, one cancelled client must not cancel the others waiting on it
+        return await asyncio.shield(task)
+
+    async def _compute(self, cache_key, values, max_only):
+        try:
+            data = await asyncio.get_running_loop().run_in_executor(self.pool, _compute, values, max_only)
+            dist = PetDistribution.from_buffer(data)
+            self.counters["computed"] += 1
+            self.cache.put(cache_key, dist)
+            return dist
+        finally:
+            del self._in_flight[cache_key]
+
+    async def pet(self, request):
+        if "name" in request:
+            if request["name"] not in self.presets:
+                raise RequestError(404, f"unknown pet {request['name']}")
+            values = self.presets[request["name"]]
+        else:
+            values = request.get("values")
+        # bool is an int subclass, true/false are not stats
+        if not isinstance(values, list) or len(values) != 5 or not all(
+            isinstance(v, int) and not isinstance(v, bool) for v in values
+        ):
+            raise RequestError(400, "values must be 5 integers: 초기계수 HP Att Def Agi")
+        max_only = bool(request.get("max_only", True))
+        sort_key = request.get("sort_key", "base_chance")
+        if sort_key not in SORT_KEYS:
+            raise RequestError(400, f"sort_key must be one of {', '.join(SORT_KEYS)}")
+        limit = request.get("limit")
+        if limit is not None and (not isinstance(limit, int) or isinstance(limit, bool)):
+            raise RequestError(400, "limit must be an integer")
+
+        dist = await self.get_distribution(values, max_only)
+        view = ChanceView(dist, values)
+        entries = view.entries(max_only, sort_key)
+        if limit is not None:
+            entries = entries[:limit]
+        return {
+            "values": values,
+            "represent": represent_s_pet(*values),
+            "min_hp": view.min_hp(max_only),
+            "rows": [
+                {
+                    "stat": list(stat),
+                    "base_chance": per_d["base_chance"],
+                    "encounter_chance": per_d["encounter_chance"],
+                    "max": per_d["max"],
+                    "text": format_entry(stat, per_d, max_only).rstrip("\n"),
+                }
+                for stat, per_d in entries
+            ],
+        }
+
+    def exp(self, request):
+        try:
+            exp = int(request["exp"])
+            current_lvl = int(request["current_lvl"])
+            current_per = float(request.get("current_per", 0))
+            desired_lvl = int(request["desired_lvl"])
+            buffs = {name: int(request[name]) for name in EXP_ARGUMENTS if name in request}
+        except (KeyError, TypeError, ValueError):
+            raise RequestError(400, "exp, current_lvl and desired_lvl are required numbers")
+        try:
+            check_level_range(current_lvl, current_per, desired_lvl)
+        except ValueError:
+            raise RequestError(400, "current_lvl and desired_lvl must be 1..150, current_per 0..100")
+        exp_per_hour = calculate_exp_buff(exp, **buffs)
+        time_in_min = calculate_time_for_lvl(current_lvl, current_per, desired_lvl, exp_per_hour)
+        return {
+            "exp_per_hour": exp_per_hour,
+            "remaining_exp": _remaining_exp(current_lvl, current_per, desired_lvl),
+            "time_in_min": time_in_min,
+            "time": _format_time(time_in_min),
+        }
+
+    async def dispatch(self, method, path, body):
+        if method == "GET" and path == "/stats":
+            return {**self.counters, "cached": len(self.cache), "in_flight": len(self._in_flight)}
+        if path not in ("/pet", "/exp"):
+            raise RequestError(404, f"no endpoint {path}")
+        if method != "POST":
+            raise RequestError(405, "use POST")
+        try:
+            request = json.loads(body or b"{}")
+        except ValueError:
+            raise RequestError(400, "body is not JSON")
+        if not isinstance(request, dict):
+            raise RequestError(400, "body must be a JSON object")
+        if path == "/pet":
+            return await self.pet(request)
+        return self.exp(request)
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                self.counters["requests"] += 1
+                try:
+                    status, result = 200, await self.dispatch(method, path, body)
+                except RequestError as e:
+                    status, result = e.status, {"error": str(e)}
+                except Exception as e:
+                    status, result = 500, {"error": repr(e)}
+                if status != 200:
+                    self.counters["errors"] += 1
+
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                payload = json.dumps(result, ensure_ascii=False).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1")
+                    + payload
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+async def serve(host="127.0.0.1", port=DEFAULT_PORT, workers=None, cache_size=256):
+    try:
+        catalog = PetCatalog.open_current()
+    except OSError:
+        catalog = None
+    service = PetService(workers, cache_size, catalog, load_pet_presets())
+    server = await asyncio.start_server(service.handle, host, port)
+    print(f"serving on http://{host}:{port}", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the calculators as JSON over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, help="processes for the pet math, all cores by default")
+    parser.add_argument("--cache-size", type=int, default=256, help="pets kept in memory")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.cache_size))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
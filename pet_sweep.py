@@ -0,0 +1,226 @@
+'''
+Sensitivity sweep: how a pet's results move when its preset is slightly off.
+
+    python pet_sweep.py 두리 --base 1 --k 1
+    python pet_sweep.py 20 22 23 11 23 --observed "8 6 6 42"
+
+Every combination of 초기계수 within ±base and each base stat within ±k is
+evaluated (3 * 3^4 = 243 variants for the defaults), reporting the minimum HP
+of a max base pet, the chance that a fresh pet's stat proves it is max base,
+and optionally the max base and encounter chance of one observed stat.
+
+Variants sharing a 초기계수 are evaluated together. The offset table is
+computed once per ruleset, the derived stat of every raw stat any of them can
+reach is computed once per group, and each variant only regroups its
+offsets. With numpy that is a gather and a bincount per variant, without it
+the derived stats are memoized across the group. Groups run in a process pool.
+'''
+
+import argparse
+import sys
+from collections import namedtuple
+from functools import lru_cache
+from itertools import product
+
+from pet_calculator import (
+    DERIVED_COEFFICIENTS, _build_offset_table, _derive_numpy, _sum_offsets,
+    get_default_engine, get_derive, get_tables, parse_stat, round_to_significant,
+)
+from presets import load_pet_presets
+
+# min_hp and min_hp_all as get_min_hp(max_only=True/False), None when no stat
+# qualifies. base_chance and encounter_chance are for the observed stat, None
+# without one (and 0 when the variant cannot roll it).
+SweepRow = namedtuple(
+    "SweepRow", ["values", "min_hp", "min_hp_all", "certain_max_chance", "base_chance", "encounter_chance"]
+)
+
+def variants(values, base_range=1, k=1):
+    """Preset values for every 초기계수 within ±base_range and base stat within ±k"""
+    i_base, i_hp, i_at, i_df, i_sp = values
+    for d_base in range(-base_range, base_range + 1):
+        for d_hp, d_at, d_df, d_sp in product(range(-k, k + 1), repeat=4):
+            yield (i_base + d_base, i_hp + d_hp, i_at + d_at, i_df + d_df, i_sp + d_sp)
+
+def _summarise(values, totals, total_weight, observed):
+    # totals as returned by _sum_offsets
+    min_hp = min_hp_all = None
+    certain = 0
+    for stat, (count, weight, max_count) in totals.items():
+        if max_count:
+            min_hp = stat[0] if min_hp is None else min(min_hp, stat[0])
+            if max_count == count:
+                certain += weight
+        else:
+            min_hp_all = stat[0] if min_hp_all is None else min(min_hp_all, stat[0])
+    base_chance = encounter_chance = None
+    if observed is not None:
+        count, weight, max_count = totals.get(observed, (1, 0, 0))
+        base_chance, encounter_chance = max_count / count, weight / total_weight
+    return SweepRow(values, min_hp, min_hp_all, certain / total_weight, base_chance, encounter_chance)
+
+def _sweep_group_python(i_base, bases, observed, tables, coefficients):
+    derive = get_derive(coefficients)
+    memo = {}
+
+    def memo_derive(s, i_base):
+        derived = memo.get(s)
+        if derived is None:
+            derived = memo[s] = derive(s, i_base)
+        return derived
+
+    offset_table = _build_offset_table(tables)
+    total_weight = len(tables.mods) * tables.total_weight
+    return [
+        _summarise((i_base, *base), _sum_offsets(i_base, *base, offset_table, memo_derive), total_weight, observed)
+        for base in bases
+    ]
+
+@lru_cache(maxsize=None)
+def _offset_arrays(tables):
+    import numpy as np
+    offset_table = _build_offset_table(tables)
+    offsets = np.array([offset for offset, *_ in offset_table], dtype=np.int64).T
+    counts, weights, max_counts = (
+        np.array([entry[column] for entry in offset_table], dtype=np.int64) for column in (1, 2, 3)
+    )
+    return offsets, counts, weights, max_counts
+
+def _sweep_group_numpy(i_base, bases, observed, tables, coefficients):
+    import numpy as np
+
+    offsets, counts, weights, max_counts = _offset_arrays(tables)
+    total_weight = len(tables.mods) * tables.total_weight
+    base_array = np.asarray(bases, dtype=np.int64).T
+
+    # Every raw stat any variant reaches lies in this box, derive each cell once
+    low = offsets.min(axis=1) + base_array.min(axis=1)
+    shape = offsets.max(axis=1) + base_array.max(axis=1) - low + 1
+    box = np.indices(shape).reshape(4, -1) + low[:, None]
+    derived = _derive_numpy(box, i_base, coefficients)
+    d_low = derived.min(axis=1)
+    d_span = derived.max(axis=1) - d_low + 1
+    keys = (((derived[0] - d_low[0]) * d_span[1] + derived[1] - d_low[1]) * d_span[2]
+            + derived[2] - d_low[2]) * d_span[3] + derived[3] - d_low[3]
+    # Number the distinct derived stats once, so a variant only has to bincount
+    unique, first, cell_ids = np.unique(keys, return_index=True, return_inverse=True)
+    hp = derived[0, first]
+    observed_id = None
+    if observed is not None and all(d_low[i] <= observed[i] < d_low[i] + d_span[i] for i in range(4)):
+        observed_key = (((observed[0] - d_low[0]) * d_span[1] + observed[1] - d_low[1]) * d_span[2]
+                        + observed[2] - d_low[2]) * d_span[3] + observed[3] - d_low[3]
+        i = np.searchsorted(unique, observed_key)
+        if i < len(unique) and unique[i] == observed_key:
+            observed_id = i
+
+    # A variant moves every offset by the same flat distance in the box
+    strides = np.array([shape[1] * shape[2] * shape[3], shape[2] * shape[3], shape[3], 1])
+    offset_cells = strides @ (offsets - offsets.min(axis=1)[:, None])
+
+    rows = []
+    for base, shift in zip(bases, strides @ (base_array - base_array.min(axis=1)[:, None])):
+        ids = cell_ids[offset_cells + shift]
+        group_counts = np.bincount(ids, counts, len(unique))
+        group_weights = np.bincount(ids, weights, len(unique))
+        group_max_counts = np.bincount(ids, max_counts, len(unique))
+        rolled = group_counts > 0
+        is_max = group_max_counts > 0
+        is_other = rolled & ~is_max
+        min_hp = int(hp[is_max].min()) if is_max.any() else None
+        min_hp_all = int(hp[is_other].min()) if is_other.any() else None
+        # Float sums of integer weights below 2 ** 53 are exact
+        certain = int(group_weights[is_max & (group_max_counts == group_counts)].sum())
+        base_chance = encounter_chance = None
+        if observed is not None:
+            base_chance = encounter_chance = 0.0
+            if observed_id is not None and rolled[observed_id]:
+                base_chance = int(group_max_counts[observed_id]) / int(group_counts[observed_id])
+                encounter_chance = int(group_weights[observed_id]) / total_weight
+        rows.append(SweepRow(
+            (i_base, *base), min_hp, min_hp_all, certain / total_weight, base_chance, encounter_chance
+        ))
+    return rows
+
+SWEEP_ENGINES = {
+    "python": _sweep_group_python,
+    "numpy": _sweep_group_numpy,
+}
+
+def _sweep_group(task):
+    i_base, bases, observed, engine = task
+    return SWEEP_ENGINES[engine](i_base, bases, observed, get_tables(), DERIVED_COEFFICIENTS)
+
+def sweep(values, base_range=1, k=1, observed=None, engine=None, workers=None):
+    """
+    SweepRow for every variant of values (see variants), in variants order.
+    observed is an (hp, att, df, agi) stat to follow across the variants.
+    workers: processes for the 초기계수 groups, all cores by default, 1 runs here.
+    """
+    if engine is None:
+        engine = get_default_engine()
+    if observed is not None:
+        observed = tuple(observed)
+    groups = {}
+    for i_base, *base in variants(values, base_range, k):
+        groups.setdefault(i_base, []).append(tuple(base))
+    tasks = [(i_base, bases, observed, engine) for i_base, bases in groups.items()]
+
+    if workers == 1 or len(tasks) == 1:
+        results = map(_sweep_group, tasks)
+        return [row for rows in results for row in rows]
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=min(workers or len(tasks), len(tasks))) as executor:
+        return [row for rows in executor.map(_sweep_group, tasks) for row in rows]
+
+def _percent(p):
+    return "-" if p is None else f"{round_to_significant(p * 100)}%"
+
+def _shift(value, center):
+    if value is None or center is None or value == center:
+        return ""
+    return f" ({value - center:+})"
+
+def format_sweep(rows, values):
+    """Text table of a sweep, the unperturbed preset first and then every variant that differs from it"""
+    values = tuple(values)
+    center = next(row for row in rows if row.values == values)
+    observed = center.base_chance is not None
+    header = "초기 체 공 방 순".split() + ["최소체력", "확정 맥베"]
+    if observed:
+        header += ["관측 맥베", "관측 등장"]
+    lines = ["\t".join(header)]
+    for row in [center] + [row for row in rows if row is not center]:
+        if row is not center and row[1:] == center[1:]:
+            continue
+        cells = [
+            f"{value}" if row is center else f"{value}{_shift(value, base)}"
+            for value, base in zip(row.values, values)
+        ]
+        cells.append(f"{row.min_hp}{_shift(row.min_hp, center.min_hp)}")
+        cells.append(_percent(row.certain_max_chance))
+        if observed:
+            cells += [_percent(row.base_chance), _percent(row.encounter_chance)]
+        lines.append("\t".join(cells))
+    unchanged = sum(1 for row in rows if row is not center and row[1:] == center[1:])
+    lines.append(f"{len(rows)} 가지 중 {unchanged} 가지는 결과가 같음")
+    return "\n".join(lines) + "\n"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep a pet over nearby 초기계수 and base stats")
+    parser.add_argument("pet", nargs="+", help="pet name from pet_data.txt, or 초기계수 HP Att Def Agi")
+    parser.add_argument("--base", type=int, default=1, help="초기계수 range, ±")
+    parser.add_argument("--k", type=int, default=1, help="base stat range, ±")
+    parser.add_argument("--observed", help='observed level 1 stat as "Att Def Agi HP" (공 방 순 체)')
+    parser.add_argument("--workers", type=int, help="processes, all cores by default")
+    args = parser.parse_args(argv)
+
+    if len(args.pet) == 5:
+        values = tuple(map(int, args.pet))
+    else:
+        values = tuple(load_pet_presets()[" ".join(args.pet)])
+    observed = parse_stat(args.observed) if args.observed else None
+    rows = sweep(values, args.base, args.k, observed, workers=args.workers)
+    sys.stdout.write(format_sweep(rows, values))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+'''
+Presentation state for the last calculated pet.
+
+ChanceView keeps one pet's chance table together with its row orders for
+each sort key and filter, and the formatted text of each row. Changing the
+sort or the max base filter only re-slices what is already there, the
+table itself is never recalculated or re-sorted. Rows are formatted on
+demand, so a list view only pays for the rows it shows, and search looks
+stats up in an index instead of scanning the formatted text.
+'''
+
+from pet_calculator import format_entry, is_shown
+
+SORT_KEYS = ("base_chance", "encounter_chance")
+
+class ChanceView:
+    def __init__(self, chances, values=None):
+        """
+        chances: calculate_chances style table or PetDistribution
+        values: the inputs it was calculated from, if the caller wants to check them later
+        """
+        self.values = values
+        self.stats = []
+        self.rows = []
+        for stat, per_d in chances.items():
+            self.stats.append(stat)
+            self.rows.append(per_d)
+        self._sorted = {}
+        self._orders = {}
+        self._formatted = {True: [None] * len(self.rows), False: [None] * len(self.rows)}
+        self._min_hp = {}
+        self._search_keys = None
+        self._exact = None
+
+    def __len__(self):
+        return len(self.rows)
+
+    def sorted_rows(self, sort_key="base_chance"):
+        # Stable and descending, same as formatted_distribution
+        order = self._sorted.get(sort_key)
+        if order is None:
+            order = sorted(range(len(self.rows)), key=lambda i: self.rows[i][sort_key], reverse=True)
+            self._sorted[sort_key] = order
+        return order
+
+    def order(self, max_only=True, sort_key="base_chance"):
+        """Row indexes shown for this filter, in display order"""
+        key = (max_only, sort_key)
+        order = self._orders.get(key)
+        if order is None:
+            order = [i for i in self.sorted_rows(sort_key) if is_shown(self.rows[i], max_only)]
+            self._orders[key] = order
+        return order
+
+    def entries(self, max_only=True, sort_key="base_chance"):
+        return [(self.stats[i], self.rows[i]) for i in self.order(max_only, sort_key)]
+
+    def entry_text(self, i, max_only=True):
+        formatted = self._formatted[max_only]
+        text = formatted[i]
+        if text is None:
+            text = formatted[i] = format_entry(self.stats[i], self.rows[i], max_only)
+        return text
+
+    def min_hp(self, max_only=True):
+        """None when no row matches, with max_only=False when every stat is a max base"""
+        if max_only not in self._min_hp:
+            self._min_hp[max_only] = min(
+                (stat[0] for stat, per_d in zip(self.stats, self.rows) if per_d.get("max", False) is max_only),
+                default=None,
+            )
+        return self._min_hp[max_only]
+
+    def _build_search_index(self):
+        # Each row is searchable by the two ways its header line spells the stat
+        # (공방순체 run together and space separated), the exact forms go in a dict
+        self._search_keys = []
+        self._exact = {}
+        for i, (hp, att, df, agi) in enumerate(self.stats):
+            compact = f"{att}{df}{agi}{hp}"
+            spaced = f"{att} {df} {agi} {hp}"
+            self._search_keys.append(f"{compact}\n{spaced}")
+            self._exact.setdefault(compact, []).append(i)
+            self._exact.setdefault(spaced, []).append(i)
+
+    def search(self, query, max_only=True, sort_key="base_chance"):
+        """Display positions of the rows whose stat matches query, in display order"""
+        query = query.strip()
+        if not query:
+            return []
+        if self._search_keys is None:
+            self._build_search_index()
+        exact = self._exact.get(query)
+        if exact is not None:
+            position = self._positions(max_only, sort_key)
+            return sorted(position[i] for i in exact if i in position)
+        keys = self._search_keys
+        return [n for n, i in enumerate(self.order(max_only, sort_key)) if query in keys[i]]
+
+    def _positions(self, max_only, sort_key):
+        key = ("positions", max_only, sort_key)
+        position = self._orders.get(key)
+        if position is None:
+            position = {i: n for n, i in enumerate(self.order(max_only, sort_key))}
+            self._orders[key] = position
+        return position
@@ -0,0 +1,37 @@
+'''
+Readers for the tab separated preset files shipped next to the app.
+
+pet_data.txt:  name, 초기계수, HP, Att, Def, Agi
+hunt_data.txt: hunting ground, exp per hour
+'''
+
+PET_DATA_PATH = "pet_data.txt"
+HUNT_DATA_PATH = "hunt_data.txt"
+
+def parse_pet_line(line):
+    # Returns (name, [i_base, i_hp, i_at, i_df, i_sp]) or None for malformed lines
+    parts = line.strip().split("\t")
+    if len(parts) == 6:
+        return parts[0], list(map(int, parts[1:]))
+    return None
+
+def load_pet_presets(path=PET_DATA_PATH):
+    pet_preset_data = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            row = parse_pet_line(line)
+            if row is not None:
+                key, values = row
+                pet_preset_data[key] = values
+    return pet_preset_data
+
+def load_hunt_presets(path=HUNT_DATA_PATH):
+    hunt_preset_data = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            parts = line.strip().split("\t")
+            if len(parts) == 2:
+                hunt_area = parts[0]
+                exp = parts[1]
+                hunt_preset_data[hunt_area] = exp
+    return hunt_preset_data
@@ -0,0 +1,203 @@
+'''
+Stage timings and counters for the calculators.
+
+    PET_PROFILE=1 python ui.py                  summary table on stderr at exit
+    PET_PROFILE_TRACE=trace.json python ui.py   Chrome trace (chrome://tracing, Perfetto)
+
+or from python:
+
+    import profiling
+    profiling.enable()
+    with profiling.span("my stage"):
+        ...
+    profiling.count("derived stats", len(result))
+    print(profiling.report())
+
+Spans and counters are recorded globally, and also into every capture()
+open on the same thread, which is how the UI shows the breakdown of one
+calculation. When profiling is off span() hands back a shared do-nothing
+context manager and count() returns right away, so instrumented code only
+pays for a global lookup. Work that exists only to feed a counter should be
+guarded with `if profiling.enabled:`. pet_calculator imports this module, so
+importing it stays cheap too: json and threading are only loaded when they
+are needed.
+
+The summary table comes from per-name totals, so a long session costs the
+same memory as a short one. The Chrome trace needs the raw spans and keeps
+the last MAX_EVENTS of them.
+'''
+
+import atexit
+import os
+import sys
+from _thread import get_ident
+from collections import deque
+from time import perf_counter
+
+enabled = False
+
+MAX_EVENTS = 100_000
+
+# (name, start, seconds, thread id), start is perf_counter based, the latest MAX_EVENTS
+events = deque(maxlen=MAX_EVENTS)
+# name -> [calls, total seconds, max seconds] over every span
+span_stats = {}
+counters = {}
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+# threading.local, made by enable() before anything is recorded
+_local = None
+
+def _active_runs():
+    runs = getattr(_local, "runs", None)
+    if runs is None:
+        runs = _local.runs = []
+    return runs
+
+class Run:
+    """Spans and counters of one capture()"""
+
+    def __init__(self):
+        self.spans = []
+        self.counters = {}
+
+    def durations(self):
+        """name -> total seconds, in the order the spans first finished"""
+        totals = {}
+        for name, _, seconds, _ in self.spans:
+            totals[name] = totals.get(name, 0.0) + seconds
+        return totals
+
+    def summary(self):
+        parts = [f"{name} {seconds * 1000:.1f} ms" for name, seconds in self.durations().items()]
+        parts += [f"{name} {value:,}" for name, value in self.counters.items()]
+        return " · ".join(parts)
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = perf_counter() - self.start
+        event = (self.name, self.start, seconds, get_ident())
+        events.append(event)
+        stats = span_stats.get(self.name)
+        if stats is None:
+            stats = span_stats[self.name] = [0, 0.0, 0.0]
+        stats[0] += 1
+        stats[1] += seconds
+        if seconds > stats[2]:
+            stats[2] = seconds
+        for run in _active_runs():
+            run.spans.append(event)
+        return False
+
+def span(name):
+    """Context manager timing the block under name, free when profiling is off"""
+    if not enabled:
+        return _NULL_SPAN
+    return _Span(name)
+
+def count(name, n=1):
+    if not enabled:
+        return
+    counters[name] = counters.get(name, 0) + n
+    for run in _active_runs():
+        run.counters[name] = run.counters.get(name, 0) + n
+
+class capture:
+    """
+    Collect what this thread records inside the block into run (a new Run by
+    default), pass the same run again to add a later stage to it.
+    """
+
+    def __init__(self, run=None):
+        self.run = Run() if run is None else run
+        self.runs = None
+
+    def __enter__(self):
+        # Nothing is recorded while profiling is off, so there is nothing to collect
+        if enabled:
+            self.runs = _active_runs()
+            self.runs.append(self.run)
+        return self.run
+
+    def __exit__(self, *exc):
+        if self.runs is not None:
+            self.runs.remove(self.run)
+        return False
+
+def enable():
+    global enabled, _local
+    if _local is None:
+        import threading
+        _local = threading.local()
+    enabled = True
+
+def disable():
+    global enabled
+    enabled = False
+
+def reset():
+    events.clear()
+    span_stats.clear()
+    counters.clear()
+
+def report():
+    """Table of every span name (calls, total, mean, max) followed by the counters"""
+    lines = [f"{'span':<28}{'calls':>8}{'total ms':>12}{'mean ms':>10}{'max ms':>10}"]
+    for name, (calls, total, longest) in sorted(list(span_stats.items()), key=lambda item: -item[1][1]):
+        lines.append(f"{name:<28}{calls:>8}{total * 1000:>12.1f}{total / calls * 1000:>10.2f}{longest * 1000:>10.2f}")
+    if counters:
+        lines.append("")
+        lines.append(f"{'counter':<28}{'total':>14}")
+        for name, value in counters.items():
+            lines.append(f"{name:<28}{value:>14,}")
+    return "\n".join(lines)
+
+def chrome_trace():
+    """The kept spans in Chrome trace event format, counters as totals at the end"""
+    pid = os.getpid()
+    kept = list(events)
+    trace = [
+        {"name": name, "ph": "X", "ts": start * 1e6, "dur": seconds * 1e6, "pid": pid, "tid": tid}
+        for name, start, seconds, tid in kept
+    ]
+    end = max((start + seconds for _, start, seconds, _ in kept), default=0.0)
+    trace += [
+        {"name": name, "ph": "C", "ts": end * 1e6, "pid": pid, "args": {name: value}}
+        for name, value in counters.items()
+    ]
+    return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+def write_chrome_trace(path):
+    import json
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(chrome_trace(), f)
+    return path
+
+def _report_at_exit(trace_path):
+    if trace_path:
+        write_chrome_trace(trace_path)
+    else:
+        print(report(), file=sys.stderr)
+
+_trace_path = os.environ.get("PET_PROFILE_TRACE")
+if os.environ.get("PET_PROFILE") == "1" or _trace_path:
+    enable()
+    atexit.register(_report_at_exit, _trace_path)
@@ -0,0 +1,307 @@
+'''
+Pet sprites for the pet tab.
+
+Sprites are decoded once into frames already scaled to the label, and kept in
+an LRU bounded by the bytes those frames take. SpriteLoader decodes sprites
+on a background thread, so the pets around the current dropdown entry are
+usually ready before they are picked, and a pet that is not is shown when
+its loaded signal arrives.
+
+Sprites are read from Picture/<name>.gif, or from a single packed bundle when
+one has been built with `python sprite_cache.py` and still matches Picture/
+(a gif missing from the bundle is still read from Picture/):
+
+    header   magic, sprite count, signature of Picture/
+    index    one fixed size entry per sprite (data offset/size, name)
+    names    utf-8 names referenced by the index
+    data     the gif files as they are
+'''
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from collections import OrderedDict
+
+from PySide6.QtCore import QBuffer, QByteArray, QIODevice, QObject, QRunnable, QThreadPool, QTimer, Signal
+from PySide6.QtGui import QImageReader, QPixmap
+
+PICTURE_DIR = "Picture"
+BUNDLE_PATH = "sprites.bin"
+
+_MAGIC = b"SPRT"
+_HEADER = struct.Struct("<4sI20s")
+# data offset, data size, name offset, name size
+_ENTRY = struct.Struct("<QIIH")
+
+def _gif_names(picture_dir):
+    return sorted(f[:-4] for f in os.listdir(picture_dir) if f.endswith(".gif"))
+
+def picture_signature(picture_dir=PICTURE_DIR):
+    # Names, sizes and mtimes, so the bundle is rebuilt when any gif changes
+    h = hashlib.sha1()
+    for name in _gif_names(picture_dir):
+        st = os.stat(os.path.join(picture_dir, name + ".gif"))
+        h.update(f"{name}\0{st.st_size}\0{st.st_mtime_ns}\n".encode("utf-8"))
+    return h.digest()
+
+def build_bundle(picture_dir=PICTURE_DIR, out=BUNDLE_PATH):
+    names = _gif_names(picture_dir)
+    encoded_names = [name.encode("utf-8") for name in names]
+    names_offset = _HEADER.size + _ENTRY.size * len(names)
+    data_offset = names_offset + sum(map(len, encoded_names))
+
+    blobs = []
+    for name in names:
+        with open(os.path.join(picture_dir, name + ".gif"), "rb") as f:
+            blobs.append(f.read())
+
+    tmp = out + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, len(names), picture_signature(picture_dir)))
+        name_offset = names_offset
+        for name, blob in zip(encoded_names, blobs):
+            f.write(_ENTRY.pack(data_offset, len(blob), name_offset, len(name)))
+            name_offset += len(name)
+            data_offset += len(blob)
+        f.writelines(encoded_names)
+        f.writelines(blobs)
+    os.replace(tmp, out)
+    return out
+
+def is_current(out=BUNDLE_PATH, picture_dir=PICTURE_DIR):
+    try:
+        with open(out, "rb") as f:
+            magic, _, signature = _HEADER.unpack(f.read(_HEADER.size))
+    except (OSError, struct.error):
+        return False
+    return magic == _MAGIC and signature == picture_signature(picture_dir)
+
+class SpriteBundle:
+    def __init__(self, out=BUNDLE_PATH):
+        with open(out, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, _ = _HEADER.unpack_from(self._map)
+        if magic != _MAGIC:
+            raise ValueError(f"{out} is not a sprite bundle")
+        self._entries = {}
+        for i in range(count):
+            data_offset, data_size, name_offset, name_size = _ENTRY.unpack_from(
+                self._map, _HEADER.size + i * _ENTRY.size
+            )
+            name = self._map[name_offset:name_offset + name_size].decode("utf-8")
+            self._entries[name] = (data_offset, data_size)
+
+    def read(self, name):
+        entry = self._entries.get(name)
+        if entry is None:
+            return None
+        data_offset, data_size = entry
+        return self._map[data_offset:data_offset + data_size]
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+class SpriteSource:
+    """Gif bytes by pet name, from the bundle if there is one, else Picture/"""
+
+    def __init__(self, picture_dir=PICTURE_DIR, bundle_path=BUNDLE_PATH):
+        self.picture_dir = picture_dir
+        self.bundle_path = bundle_path
+        self._bundle = None
+        self._opened = False
+
+    @property
+    def bundle(self):
+        # Opened on first read, which is on the loader thread, so checking it
+        # against Picture/ (a stat of every gif, a few ms) stays off startup.
+        # A stale bundle is not used, rebuild it with `python sprite_cache.py`
+        if not self._opened:
+            self._opened = True
+            try:
+                current = is_current(self.bundle_path, self.picture_dir)
+            except OSError:
+                # No Picture/ to compare with, the bundle is all there is
+                current = True
+            if current:
+                try:
+                    self._bundle = SpriteBundle(self.bundle_path)
+                except (OSError, ValueError, struct.error):
+                    pass
+        return self._bundle
+
+    def read(self, name):
+        if self.bundle is not None:
+            data = self.bundle.read(name)
+            if data is not None:
+                return data
+        # Not in the bundle, or no bundle: a gif added since it was built
+        try:
+            with open(os.path.join(self.picture_dir, name + ".gif"), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+def decode_frames(data, size):
+    """[(QImage, delay ms)] of a gif scaled to size, empty if it cannot be read"""
+    if data is None:
+        return []
+    buffer = QBuffer()
+    buffer.setData(QByteArray(data))
+    buffer.open(QIODevice.ReadOnly)
+    reader = QImageReader(buffer, b"gif")
+    reader.setScaledSize(size)
+    frames = []
+    while True:
+        image = reader.read()
+        if image.isNull():
+            break
+        frames.append((image, reader.nextImageDelay()))
+    return frames
+
+class Sprite:
+    __slots__ = ("pixmaps", "delays", "nbytes")
+
+    def __init__(self, frames):
+        # QPixmap is GUI thread only, frames come in as QImage from the loader
+        self.pixmaps = [QPixmap.fromImage(image) for image, _ in frames]
+        self.delays = [delay for _, delay in frames]
+        self.nbytes = sum(image.sizeInBytes() for image, _ in frames)
+
+class SpriteCache:
+    """Sprites by name, least recently shown dropped first once over max_bytes"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._data = OrderedDict()
+
+    def get(self, name):
+        sprite = self._data.get(name)
+        if sprite is not None:
+            self._data.move_to_end(name)
+        return sprite
+
+    def put(self, name, sprite):
+        old = self._data.pop(name, None)
+        if old is not None:
+            self.nbytes -= old.nbytes
+        self._data[name] = sprite
+        self.nbytes += sprite.nbytes
+        while self.nbytes > self.max_bytes and len(self._data) > 1:
+            _, dropped = self._data.popitem(last=False)
+            self.nbytes -= dropped.nbytes
+
+    def __contains__(self, name):
+        return name in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+class SpriteLoadSignals(QObject):
+    loaded = Signal(str, object)
+
+class SpriteLoadWorker(QRunnable):
+    def __init__(self, source, names, size):
+        super().__init__()
+        self.source = source
+        self.names = names
+        self.size = size
+        self.signals = SpriteLoadSignals()
+
+    def run(self):
+        for name in self.names:
+            self.signals.loaded.emit(name, decode_frames(self.source.read(name), self.size))
+
+class SpriteLoader(QObject):
+    """
+    Hands out cached sprites and decodes the rest in the background, loaded
+    is emitted with (name, Sprite) once a sprite is in the cache.
+    """
+
+    loaded = Signal(str, object)
+
+    def __init__(self, size, max_bytes=64 * 1024 * 1024, source=None, parent=None):
+        super().__init__(parent)
+        self.size = size
+        self.source = source if source is not None else SpriteSource()
+        self.cache = SpriteCache(max_bytes)
+        self._pending = set()
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(1)
+
+    def get(self, name):
+        """Cached sprite for name, or None after queueing it ahead of the prefetches"""
+        sprite = self.cache.get(name)
+        if sprite is None:
+            self._load([name], priority=1)
+        return sprite
+
+    def prefetch(self, names):
+        self._load(names)
+
+    def _load(self, names, priority=0):
+        # Names already being decoded are left to the worker that has them
+        names = [name for name in names if name not in self.cache and name not in self._pending]
+        if not names:
+            return
+        self._pending.update(names)
+        worker = SpriteLoadWorker(self.source, names, self.size)
+        worker.signals.loaded.connect(self._on_loaded)
+        self.thread_pool.start(worker, priority)
+
+    def _on_loaded(self, name, frames):
+        self._pending.discard(name)
+        sprite = self.cache.get(name)
+        if sprite is None:
+            sprite = Sprite(frames)
+            self.cache.put(name, sprite)
+        self.loaded.emit(name, sprite)
+
+class SpritePlayer(QObject):
+    """Plays a Sprite on a QLabel, looping like QMovie does for gifs"""
+
+    def __init__(self, label, parent=None):
+        super().__init__(parent)
+        self.label = label
+        self.sprite = None
+        self.frame = 0
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self._next_frame)
+
+    def play(self, sprite):
+        self.timer.stop()
+        self.sprite = sprite
+        self.frame = 0
+        if not sprite.pixmaps:
+            self.label.clear()
+            return
+        self._show_frame()
+
+    def clear(self):
+        self.timer.stop()
+        self.sprite = None
+        self.label.clear()
+
+    def _show_frame(self):
+        self.label.setPixmap(self.sprite.pixmaps[self.frame])
+        if len(self.sprite.pixmaps) > 1:
+            self.timer.start(self.sprite.delays[self.frame] or 100)
+
+    def _next_frame(self):
+        self.frame = (self.frame + 1) % len(self.sprite.pixmaps)
+        self._show_frame()
+
+if __name__ == "__main__":
+    picture_dir = sys.argv[1] if len(sys.argv) > 1 else PICTURE_DIR
+    out = sys.argv[2] if len(sys.argv) > 2 else BUNDLE_PATH
+    if is_current(out, picture_dir):
+        print(f"{out} is up to date")
+    else:
+        build_bundle(picture_dir, out)
+        print(f"wrote {out}")
@@ -1,38 +1,85 @@
 # ui_qt.py
+import time
+_startup_time = time.perf_counter()
+
+import os
 import sys
+from functools import lru_cache
 from PySide6.QtWidgets import (
     QApplication, QWidget, QLabel, QLineEdit, QTextEdit,
     QVBoxLayout, QHBoxLayout, QPushButton, QComboBox, QCheckBox,
-    QMainWindow, QTabWidget
+    QMainWindow, QTabWidget, QListView, QAbstractItemView, QCompleter
+)
+from PySide6.QtGui import QShortcut, QKeySequence, QColor, QIcon, QIntValidator
+from PySide6.QtCore import (
+    Qt, QTimer, QObject, QRunnable, QThreadPool, Signal, QAbstractListModel, QModelIndex,
+    QStringListModel
 )
-from PySide6.QtGui import QShortcut, QKeySequence, QTextCharFormat, QColor, QTextCursor, QMovie, QIcon, QIntValidator
-from PySide6.QtCore import Qt, QTimer
 
-from pet_calculator import get_distribution_dict, pet_calculate, represent_s_pet, get_min_hp, formatted_distribution
+import profiling
+from pet_calculator import one_in_x_korean, parse_stat, represent_s_pet, round_to_significant
+from pet_view import ChanceView
+from presets import load_pet_presets, load_hunt_presets
 from exp_calculator import calculate_exp_buff, calculate_time_for_lvl, format_result
+# pet_query, pet_sweep, sprite_cache and label_search are imported where they
+# are first used, after the window is up
 
-# Load presets
-pet_preset_data = {}
-with open("pet_data.txt", encoding="utf-8") as f:
-    for line in f:
-        parts = line.strip().split("\t")
-        if len(parts) == 6:
-            key = parts[0]
-            values = list(map(int, parts[1:]))
-            pet_preset_data[key] = values
+# STARTUP_TRACE=1 prints how long each startup phase took
+STARTUP_TRACE = os.environ.get("STARTUP_TRACE") == "1"
+startup_phases = []
+
+def startup_phase(name):
+    """Record the time since the previous phase"""
+    global _startup_time
+    now = time.perf_counter()
+    startup_phases.append((name, now - _startup_time))
+    _startup_time = now
 
-all_pet_labels = list(pet_preset_data.keys())
+def print_startup_trace():
+    for name, seconds in startup_phases:
+        print(f"{name:<16}{seconds * 1000:8.1f} ms", file=sys.stderr)
+    print(f"{'total':<16}{sum(s for _, s in startup_phases) * 1000:8.1f} ms", file=sys.stderr)
 
+# Presets can load before or after the first show, the trace waits for both
+_startup_waiting = {"presets", "first show"}
+
+def startup_done(name):
+    startup_phase(name)
+    _startup_waiting.discard(name)
+    if STARTUP_TRACE and not _startup_waiting:
+        print_startup_trace()
+
+startup_phase("imports")
+
+# Presets are filled in by PresetLoadWorker once the window is up
+pet_preset_data = {}
 hunt_preset_data = {}
-with open("hunt_data.txt", encoding="utf-8") as f:
-    for line in f:
-        parts = line.strip().split("\t")
-        if len(parts) == 2:
-            hunt_area = parts[0]
-            exp = parts[1]
-            hunt_preset_data[hunt_area] = exp
 
-all_hunt_labels = list(hunt_preset_data.keys())
+@lru_cache(maxsize=None)
+def get_pet_sources():
+    # Opened on first calculation, on the worker thread
+    import sqlite3
+    from pet_cache import PetCache
+    from pet_catalog import PetCatalog
+    try:
+        catalog = PetCatalog.open_current()
+    except OSError:
+        catalog = None
+    try:
+        cache = PetCache()
+    except sqlite3.Error:
+        # e.g. a read-only folder, keep results in memory only
+        cache = PetCache(path=None)
+    return catalog, cache
+
+def get_pet_result(values):
+    # Presets come straight from the catalog, anything typed in goes through the cache
+    pet_catalog, pet_cache = get_pet_sources()
+    if pet_catalog is not None:
+        result = pet_catalog.find(*values)
+        if result is not None:
+            return result
+    return pet_cache.get(*values)
 
 class SwitchButton(QCheckBox):
     def __init__(self, label="", parent=None):
@@ -53,9 +100,172 @@ class SwitchButton(QCheckBox):
             }
         """)
 
+class LabelCompleter(QCompleter):
+    """Completer popup ranked by a LabelIndex instead of Qt's prefix filter"""
+
+    def __init__(self, line_edit, limit=20, parent=None):
+        super().__init__(parent)
+        self.index = None
+        self.limit = limit
+        self.candidates = QStringListModel(self)
+        self.setModel(self.candidates)
+        self.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.line_edit = line_edit
+        line_edit.textEdited.connect(self.update_candidates)
+
+    def set_labels(self, labels):
+        from label_search import LabelIndex
+        self.index = LabelIndex(labels)
+
+    def update_candidates(self, text):
+        matches = self.index.search(text, self.limit) if self.index is not None and text.strip() else []
+        self.candidates.setStringList(matches)
+        if matches and matches != [text]:
+            self.complete()
+        else:
+            self.popup().hide()
+
+class ResultListModel(QAbstractListModel):
+    """
+    One row per shown stat of a ChanceView, formatted only when Qt asks for
+    it, so only the rows on screen are ever turned into text.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.view = None
+        self.order = []
+        self.max_only = True
+        self.message = ""
+        self.matches = set()
+
+    def set_view(self, view, max_only, sort_key):
+        self.beginResetModel()
+        self.view = view
+        self.order = view.order(max_only, sort_key)
+        self.max_only = max_only
+        self.message = ""
+        self.matches = set()
+        self.endResetModel()
+
+    def set_message(self, message):
+        self.beginResetModel()
+        self.view = None
+        self.order = []
+        self.message = message
+        self.matches = set()
+        self.endResetModel()
+
+    def set_matches(self, rows):
+        changed = self.matches.symmetric_difference(rows)
+        self.matches = set(rows)
+        if changed:
+            self.dataChanged.emit(self.index(min(changed)), self.index(max(changed)), [Qt.BackgroundRole])
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        if self.view is None:
+            return 1 if self.message else 0
+        return len(self.order)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if self.view is None:
+            return self.message if role == Qt.DisplayRole else None
+        if role == Qt.DisplayRole:
+            return self.view.entry_text(self.order[index.row()], self.max_only).rstrip("\n")
+        if role == Qt.BackgroundRole and index.row() in self.matches:
+            return QColor("yellow")
+        return None
+
+class PetCalculationSignals(QObject):
+    # generation, ChanceView, profiling.Run of the calculation
+    finished = Signal(int, object, object)
+    failed = Signal(int)
+
+class PetCalculationWorker(QRunnable):
+    """Runs the pet calculation and formatting off the GUI thread"""
+
+    def __init__(self, generation, values, sort_key):
+        super().__init__()
+        self.generation = generation
+        self.values = values
+        self.sort_key = sort_key
+        self.signals = PetCalculationSignals()
+
+    def run(self):
+        with profiling.capture() as run:
+            try:
+                with profiling.span("lookup"):
+                    result = get_pet_result(self.values)
+                with profiling.span("sort"):
+                    view = ChanceView(result, self.values)
+                    # Sort up front, rows are formatted as the list shows them
+                    for max_only in (True, False):
+                        view.order(max_only, self.sort_key)
+                    view.min_hp()
+            except Exception:
+                # Anything that goes wrong must still clear the busy state
+                self.signals.failed.emit(self.generation)
+                return
+        self.signals.finished.emit(self.generation, view, run)
+
+class SweepSignals(QObject):
+    finished = Signal(int, str)
+    failed = Signal(int)
+
+class SweepWorker(QRunnable):
+    """Runs a sensitivity sweep off the GUI thread"""
+
+    def __init__(self, generation, values, base_range, k, observed):
+        super().__init__()
+        self.generation = generation
+        self.values = values
+        self.base_range = base_range
+        self.k = k
+        self.observed = observed
+        self.signals = SweepSignals()
+
+    def run(self):
+        from pet_sweep import format_sweep, sweep
+        # In process, a pool started from the GUI costs more than the sweep saves
+        try:
+            rows = sweep(self.values, self.base_range, self.k, self.observed, workers=1)
+            text = format_sweep(rows, self.values)
+        except Exception:
+            self.signals.failed.emit(self.generation)
+            return
+        self.signals.finished.emit(self.generation, text)
+
+class PresetLoadSignals(QObject):
+    loaded = Signal(object, object)
+
+class PresetLoadWorker(QRunnable):
+    """Parses pet_data.txt and hunt_data.txt off the GUI thread"""
+
+    def __init__(self):
+        super().__init__()
+        self.signals = PresetLoadSignals()
+
+    def run(self):
+        self.signals.loaded.emit(load_pet_presets(), load_hunt_presets())
+
 class PetCalculatorApp(QWidget):
+    # Breakdown of the last calculation, only emitted while profiling is on
+    profiled = Signal(str)
+
     def __init__(self):
         super().__init__()
+        # Bumped on every request, results of older requests are dropped
+        self.generation = 0
+        # Last calculated result, the switches only re-slice it
+        self.view = None
+        # Probability queries over self.view, built on the first query
+        self.stat_index = None
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(1)
         self.init_ui()
 
     def init_ui(self):
@@ -69,9 +279,10 @@ class PetCalculatorApp(QWidget):
         self.dropdown.addItem("페트 고르기")
         self.dropdown.setItemData(0, 0, role=Qt.UserRole - 1)  # Make the placeholder unselectable
         self.dropdown.lineEdit().selectAll()
-        self.dropdown.addItems(all_pet_labels)
         self.dropdown.setInsertPolicy(QComboBox.NoInsert)
         self.dropdown.currentTextChanged.connect(self.dropdown_schedule_search)
+        self.completer = LabelCompleter(self.dropdown.lineEdit(), parent=self)
+        self.dropdown.setCompleter(self.completer)
         
         # Search Timer
         self.dropdown_search_timer = QTimer()
@@ -86,6 +297,11 @@ class PetCalculatorApp(QWidget):
         self.image_label = QLabel()
         self.image_label.setFixedSize(200, 200)  # Adjust size as needed
         self.image_label.setScaledContents(False)
+        # Set up with the presets, there is no sprite to show before them
+        self.sprites = None
+        self.sprite_player = None
+        # Pet whose sprite the label should show once it is decoded
+        self.sprite_name = None
 
         self.image_layout = QHBoxLayout()
         self.image_layout.addStretch()                 # Left spacer
@@ -124,12 +340,23 @@ class PetCalculatorApp(QWidget):
         layout.addLayout(row)
 
         # Result label
-        layout.addWidget(QLabel("레벨1 페트 확률 결과:"))
+        row = QHBoxLayout()
+        row.addWidget(QLabel("레벨1 페트 확률 결과:"))
+        row.addStretch()
+        self.busy_label = QLabel("")
+        row.addWidget(self.busy_label)
+        layout.addLayout(row)
 
-        # Result box
-        self.result_box = QTextEdit()
-        self.result_box.setReadOnly(True)
-        layout.addWidget(self.result_box)
+        # Result list, rows are only formatted when scrolled into view
+        self.result_model = ResultListModel(self)
+        self.result_list = QListView()
+        self.result_list.setModel(self.result_model)
+        self.result_list.setUniformItemSizes(True)
+        self.result_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        layout.addWidget(self.result_list)
+
+        copy_shortcut = QShortcut(QKeySequence.Copy, self.result_list)
+        copy_shortcut.activated.connect(self.copy_selected_results)
 
         # Calculate button
         calc_btn = QPushButton("계산")
@@ -140,13 +367,13 @@ class PetCalculatorApp(QWidget):
         # Base sort
         self.filter_switch = SwitchButton("맥스 베이스 초기만 보기")
         self.filter_switch.setChecked(True)
-        self.filter_switch.stateChanged.connect(self.calculate)
+        self.filter_switch.stateChanged.connect(self.refresh_view)
         layout.addWidget(self.filter_switch)
 
         # Encounter sort
         self.sort_switch = SwitchButton("베이스 확률 정렬")
         self.sort_switch.setChecked(True)
-        self.sort_switch.stateChanged.connect(self.calculate)
+        self.sort_switch.stateChanged.connect(self.refresh_view)
         layout.addWidget(self.sort_switch)
 
         # Search functionality
@@ -160,6 +387,16 @@ class PetCalculatorApp(QWidget):
         self.result_search_timer.setSingleShot(True)
         self.result_search_timer.timeout.connect(lambda: self.highlight_matches(self.search_box.text()))
 
+        # Probability of a condition, or percentile of a stat typed like the list shows it
+        row = QHBoxLayout()
+        self.query_box = QLineEdit()
+        self.query_box.setPlaceholderText("확률 조건 (예: 공>=8 순 6-7) 또는 공 방 순 체")
+        self.query_box.textChanged.connect(self.update_query)
+        self.query_label = QLabel("")
+        row.addWidget(self.query_box)
+        row.addWidget(self.query_label)
+        layout.addLayout(row)
+
         # Add Ctrl+F hotkey for search using QShortcut
         search_shortcut = QShortcut(Qt.CTRL | Qt.Key_F, self)
         search_shortcut.activated.connect(self.focus_search_box)
@@ -171,6 +408,14 @@ class PetCalculatorApp(QWidget):
 
         self.setLayout(layout)
 
+    def set_presets(self):
+        from sprite_cache import SpriteLoader, SpritePlayer
+        self.sprites = SpriteLoader(self.image_label.size() / 1.5, parent=self)
+        self.sprites.loaded.connect(self.on_sprite_loaded)
+        self.sprite_player = SpritePlayer(self.image_label, self)
+        self.dropdown.addItems(list(pet_preset_data))
+        self.completer.set_labels(pet_preset_data)
+
     def focus_search_box(self):
         """Focus on the search text box when Ctrl+F is pressed."""
         self.search_box.setFocus()
@@ -185,23 +430,43 @@ class PetCalculatorApp(QWidget):
             self.calculate()
             
             # Update image
-            image_path = f"Picture/{text}.gif"
-            image_gif = QMovie(image_path)
-            image_gif.setScaledSize(self.image_label.size()/ 1.5)
-
-            if not image_gif.isValid():
-                self.image_label.clear()
+            self.sprite_name = text
+            sprite = self.sprites.get(text)
+            if sprite is not None:
+                self.sprite_player.play(sprite)
             else:
-                self.image_label.setMovie(image_gif)
-                image_gif.start()
+                self.sprite_player.clear()
+            self.prefetch_sprites(text)
 
         else:
-            self.result_box.setPlainText("")
+            # Drop whatever is still being calculated for the previous pet
+            self.generation += 1
+            self.busy_label.setText("")
+            self.result_model.set_message("")
             for i in range(5):
                 self.entries[i].setText("")
             self.represent_box.setText("")
             self.min_hp_box.setText("")
-            self.image_label.clear()
+            self.query_label.setText("")
+            self.sprite_name = None
+            if self.sprite_player is not None:
+                self.sprite_player.clear()
+
+    def on_sprite_loaded(self, name, sprite):
+        if name == self.sprite_name and self.sprite_player.sprite is not sprite:
+            self.sprite_player.play(sprite)
+
+    def prefetch_sprites(self, text, radius=3):
+        # Decode the pets next to this one in the dropdown before they are picked
+        index = self.dropdown.findText(text)
+        if index < 0:
+            return
+        names = [
+            self.dropdown.itemText(i)
+            for i in range(max(1, index - radius), min(self.dropdown.count(), index + radius + 1))
+            if i != index
+        ]
+        self.sprites.prefetch(names)
 
     def dropdown_schedule_search(self):
         self.dropdown_search_timer.start(100)
@@ -210,58 +475,117 @@ class PetCalculatorApp(QWidget):
         self.result_search_timer.start(200)
 
     def highlight_matches(self, search_term):
-        format = QTextCharFormat()
-        format.setBackground(QColor("yellow"))  # Highlight color
-
-        # Clear previous formatting
-        self.result_box.selectAll()
-        clear_format = QTextCharFormat()
-        self.result_box.textCursor().setCharFormat(clear_format)
-
-        if not search_term:
+        if self.result_model.view is None:
             return
+        rows = self.result_model.view.search(
+            search_term,
+            max_only=self.filter_switch.isChecked(),
+            sort_key="base_chance" if self.sort_switch.isChecked() else "encounter_chance"
+        )
+        self.result_model.set_matches(rows)
+        if rows:
+            # Scroll so that matched row is at the top
+            self.result_list.scrollTo(self.result_model.index(rows[0]), QAbstractItemView.PositionAtTop)
 
-        self.result_box.moveCursor(QTextCursor.Start)
-        match_cursor = self.result_box.textCursor()
-        found_first = False
-
-        while True:
-            match_cursor = self.result_box.document().find(search_term, match_cursor)
-            if match_cursor.isNull():
-                break
-
-            match_cursor.mergeCharFormat(format)
+    def copy_selected_results(self):
+        rows = sorted(index.row() for index in self.result_list.selectionModel().selectedIndexes())
+        text = "\n".join(self.result_model.data(self.result_model.index(row)) for row in rows)
+        QApplication.clipboard().setText(text)
 
-            if not found_first:
-                self.result_box.setTextCursor(match_cursor)
-                self.result_box.ensureCursorVisible()
+    def calculate(self):
+        self.generation += 1
+        try:
+            values = [int(entry.text()) for entry in self.entries]
+        except ValueError:
+            self.show_invalid(self.generation)
+            return
 
-                # Scroll so that matched line is at the top
-                layout = self.result_box.document().documentLayout()
-                rect = layout.blockBoundingRect(match_cursor.block())
-                top_position = rect.translated(0, -self.result_box.viewport().rect().top()).top()
+        worker = PetCalculationWorker(
+            self.generation,
+            values,
+            sort_key="base_chance" if self.sort_switch.isChecked() else "encounter_chance"
+        )
+        worker.signals.finished.connect(self.show_result)
+        worker.signals.failed.connect(self.show_invalid)
 
-                scroll_bar = self.result_box.verticalScrollBar()
-                scroll_bar.setValue(int(top_position))
+        # Anything still queued is already stale
+        self.thread_pool.clear()
+        self.thread_pool.start(worker)
+        self.busy_label.setText("계산 중...")
 
-                found_first = True
-    
-    def calculate(self):
+    def show_result(self, generation, view, run):
+        if generation != self.generation:
+            return
+        self.view = view
+        self.stat_index = None
+        self.busy_label.setText("")
+        with profiling.capture(run):
+            with profiling.span("render"):
+                self.render_view()
+        if profiling.enabled:
+            self.profiled.emit(run.summary())
+
+    def render_view(self):
+        self.result_model.set_view(
+            self.view,
+            max_only=self.filter_switch.isChecked(),
+            sort_key="base_chance" if self.sort_switch.isChecked() else "encounter_chance"
+        )
+        self.min_hp_box.setText(str(self.view.min_hp()))
+        if self.search_box.text():
+            self.highlight_matches(self.search_box.text())
+        self.update_query()
+
+    def update_query(self):
+        text = self.query_box.text().strip()
+        if self.view is None or not text:
+            self.query_label.setText("")
+            return
+        from pet_query import StatIndex, parse_conditions
+        if self.stat_index is None:
+            self.stat_index = StatIndex(dict(zip(self.view.stats, self.view.rows)))
+        parts = text.replace(",", " ").split()
+        if len(parts) == 4 and all(part.isdigit() for part in parts):
+            percentile = self.stat_index.percentile(parse_stat(text))
+            if percentile is None:
+                self.query_label.setText("불가능")
+            else:
+                self.query_label.setText(
+                    f"백분위 체{percentile.hp:.0%} 공{percentile.att:.0%} 방{percentile.df:.0%} 순{percentile.agi:.0%}"
+                    f" · 더 흔한 결과 {round_to_significant(percentile.rarity * 100)}%"
+                )
+            return
+        try:
+            conditions = parse_conditions(text)
+        except ValueError:
+            self.query_label.setText("잘못된 조건")
+            return
+        p = self.stat_index.probability(**conditions)
+        one_in = f" ({one_in_x_korean(p)} 중 1)" if 0 < p < 0.01 else ""
+        self.query_label.setText(f"{round_to_significant(p * 100)}%{one_in}")
+
+    def refresh_view(self):
+        # Switches only change presentation, recalculate only if the inputs moved on
+        if self.busy_label.text():
+            return  # the pending result is rendered with the switches as they are then
         try:
             values = [int(entry.text()) for entry in self.entries]
-            distribution = get_distribution_dict(*values)
-            calculated_chances = pet_calculate(distribution)
-            self.result_box.setPlainText(
-                formatted_distribution(
-                    calculated_chances,
-                    max_only=self.filter_switch.isChecked(),
-                    sort_key="base_chance" if self.sort_switch.isChecked() else "encounter_chance"
-                )
-            )
-
-            self.min_hp_box.setText(str(get_min_hp(calculated_chances)))
         except ValueError:
-            self.result_box.setPlainText("잘못된 입력")
+            values = None
+        if self.view is None or values != self.view.values:
+            self.calculate()
+        else:
+            self.render_view()
+
+    def show_invalid(self, generation):
+        if generation != self.generation:
+            return
+        self.view = None
+        self.stat_index = None
+        self.busy_label.setText("")
+        self.min_hp_box.setText("")
+        self.query_label.setText("")
+        self.result_model.set_message("잘못된 입력")
 
 class ExpCalculatorApp(QWidget):
     def __init__(self):
@@ -276,9 +600,10 @@ class ExpCalculatorApp(QWidget):
         dropdown_label = QLabel("사냥터 선택:")
         self.dropdown = QComboBox()
         self.dropdown.setEditable(True)
-        self.dropdown.addItems(all_hunt_labels)
         self.dropdown.setInsertPolicy(QComboBox.NoInsert)
         self.dropdown.currentTextChanged.connect(self.on_dropdown_select)
+        self.completer = LabelCompleter(self.dropdown.lineEdit(), parent=self)
+        self.dropdown.setCompleter(self.completer)
 
         dropdown_layout.addWidget(dropdown_label)
         dropdown_layout.addWidget(self.dropdown)
@@ -296,7 +621,6 @@ class ExpCalculatorApp(QWidget):
             layout.addLayout(row)
             if label_text == "시간당 경험치":
                 self.exp_hour = entry
-                self.exp_hour.setText(hunt_preset_data["해변 다이노 도우미"])
             if label_text == "파티원 수":
                 entry.setText("1")
                 self.party_count = entry
@@ -351,6 +675,15 @@ class ExpCalculatorApp(QWidget):
         # layout.setContentsMargins(0, 0, 0, 0)
         self.setLayout(layout)
 
+    def set_presets(self):
+        # Adding items selects the first one, keep the default hunt instead
+        self.dropdown.blockSignals(True)
+        self.dropdown.addItems(list(hunt_preset_data))
+        self.dropdown.blockSignals(False)
+        self.completer.set_labels(hunt_preset_data)
+        if not self.exp_hour.text():
+            self.exp_hour.setText(hunt_preset_data.get("해변 다이노 도우미", ""))
+
     def on_dropdown_select(self, text):
         if text in hunt_preset_data:
             self.exp_hour.setText(hunt_preset_data[text])
@@ -400,6 +733,122 @@ class ExpCalculatorApp(QWidget):
         )
 
 
+class SweepApp(QWidget):
+    """Sensitivity of a pet's results to its 초기계수 and base stats being slightly off"""
+
+    # Largest ± ranges offered, 5 * 5^4 variants already take a few seconds
+    MAX_BASE_RANGE = 2
+    MAX_K = 2
+
+    def __init__(self):
+        super().__init__()
+        self.generation = 0
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(1)
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout()
+
+        dropdown_layout = QHBoxLayout()
+        dropdown_layout.addWidget(QLabel("페트 선택:"))
+        self.dropdown = QComboBox()
+        self.dropdown.setEditable(True)
+        self.dropdown.setInsertPolicy(QComboBox.NoInsert)
+        self.dropdown.currentTextChanged.connect(self.on_dropdown_select)
+        self.completer = LabelCompleter(self.dropdown.lineEdit(), parent=self)
+        self.dropdown.setCompleter(self.completer)
+        dropdown_layout.addWidget(self.dropdown)
+        layout.addLayout(dropdown_layout)
+
+        self.entries = []
+        for label_text in ['초기계수', '체력', '공격', '방어', '순발']:
+            row = QHBoxLayout()
+            entry = QLineEdit()
+            entry.setValidator(QIntValidator())
+            self.entries.append(entry)
+            row.addWidget(QLabel(label_text))
+            row.addWidget(entry)
+            layout.addLayout(row)
+
+        row = QHBoxLayout()
+        row.addWidget(QLabel("초기계수 ±"))
+        self.base_range = QLineEdit("1")
+        self.base_range.setValidator(QIntValidator(0, self.MAX_BASE_RANGE))
+        row.addWidget(self.base_range)
+        row.addWidget(QLabel("베이스 ±"))
+        self.k = QLineEdit("1")
+        self.k.setValidator(QIntValidator(0, self.MAX_K))
+        row.addWidget(self.k)
+        layout.addLayout(row)
+
+        row = QHBoxLayout()
+        row.addWidget(QLabel("잡은 페트"))
+        self.observed = QLineEdit()
+        self.observed.setPlaceholderText("공 방 순 체 (선택)")
+        row.addWidget(self.observed)
+        layout.addLayout(row)
+
+        row = QHBoxLayout()
+        calc_btn = QPushButton("계산")
+        calc_btn.clicked.connect(self.calculate)
+        row.addWidget(calc_btn)
+        self.busy_label = QLabel("")
+        row.addWidget(self.busy_label)
+        layout.addLayout(row)
+
+        self.result_box = QTextEdit()
+        self.result_box.setReadOnly(True)
+        self.result_box.setLineWrapMode(QTextEdit.NoWrap)
+        layout.addWidget(self.result_box)
+
+        self.setLayout(layout)
+
+    def set_presets(self):
+        self.dropdown.blockSignals(True)
+        self.dropdown.addItems(list(pet_preset_data))
+        self.dropdown.setCurrentIndex(-1)
+        self.dropdown.blockSignals(False)
+        self.completer.set_labels(pet_preset_data)
+
+    def on_dropdown_select(self, text):
+        if text in pet_preset_data:
+            for entry, value in zip(self.entries, pet_preset_data[text]):
+                entry.setText(str(value))
+
+    def calculate(self):
+        self.generation += 1
+        try:
+            values = tuple(int(entry.text()) for entry in self.entries)
+            base_range = min(int(self.base_range.text() or 0), self.MAX_BASE_RANGE)
+            k = min(int(self.k.text() or 0), self.MAX_K)
+            observed = None
+            if self.observed.text().strip():
+                observed = parse_stat(self.observed.text())
+        except ValueError:
+            self.busy_label.setText("")
+            self.result_box.setPlainText("잘못된 입력")
+            return
+
+        worker = SweepWorker(self.generation, values, base_range, k, observed)
+        worker.signals.finished.connect(self.show_result)
+        worker.signals.failed.connect(self.show_invalid)
+        self.thread_pool.clear()
+        self.thread_pool.start(worker)
+        self.busy_label.setText("계산 중...")
+
+    def show_result(self, generation, text):
+        if generation != self.generation:
+            return
+        self.busy_label.setText("")
+        self.result_box.setPlainText(text)
+
+    def show_invalid(self, generation):
+        if generation != self.generation:
+            return
+        self.busy_label.setText("")
+        self.result_box.setPlainText("잘못된 입력")
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -410,17 +859,35 @@ class MainWindow(QMainWindow):
         self.setCentralWidget(self.tab_widget)
 
         # Add known tabs
-        tab1 = PetCalculatorApp()
-        tab2 = ExpCalculatorApp()
+        self.pet_tab = PetCalculatorApp()
+        self.exp_tab = ExpCalculatorApp()
+        self.sweep_tab = SweepApp()
 
-        self.tab_widget.addTab(tab1, "페트")
-        self.tab_widget.addTab(tab2, "경험치")
+        self.tab_widget.addTab(self.pet_tab, "페트")
+        self.tab_widget.addTab(self.exp_tab, "경험치")
+        self.tab_widget.addTab(self.sweep_tab, "민감도")
 
         self.resize(500, 800)
 
+        if profiling.enabled:
+            self.pet_tab.profiled.connect(self.statusBar().showMessage)
+
+        preset_worker = PresetLoadWorker()
+        preset_worker.signals.loaded.connect(self.on_presets_loaded)
+        QThreadPool.globalInstance().start(preset_worker)
+
+    def on_presets_loaded(self, pets, hunts):
+        pet_preset_data.update(pets)
+        hunt_preset_data.update(hunts)
+        self.pet_tab.set_presets()
+        self.exp_tab.set_presets()
+        self.sweep_tab.set_presets()
+        startup_done("presets")
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
-    window = PetCalculatorApp()
     window = MainWindow()
+    startup_phase("main window")
     window.show()
+    QTimer.singleShot(0, lambda: startup_done("first show"))
     sys.exit(app.exec())